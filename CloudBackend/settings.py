@@ -191,4 +191,61 @@ load_dotenv(os.path.join(BASE_DIR, '.env'))
 ALIYUN_ACCESS_KEY = os.getenv('ALIYUN_ACCESS_KEY')
 ALIYUN_ACCESS_KEY_SECRET = os.getenv('ALIYUN_ACCESS_KEY_SECRET')
 OSS_ENDPOINT = os.getenv('OSS_ENDPOINT')
-OSS_BUCKET_NAME = os.getenv('OSS_BUCKET_NAME')
\ No newline at end of file
+OSS_BUCKET_NAME = os.getenv('OSS_BUCKET_NAME')
+
+# OSS 连接池与重试配置
+OSS_POOL_SIZE = int(os.getenv('OSS_POOL_SIZE', 32))
+OSS_MAX_RETRIES = int(os.getenv('OSS_MAX_RETRIES', 3))
+OSS_RETRY_BACKOFF = float(os.getenv('OSS_RETRY_BACKOFF', 0.3))
+OSS_TIMEOUT = float(os.getenv('OSS_TIMEOUT', 10))
+
+# 下载URL签名缓存：条目上限与过期时间对齐窗口（秒，0 表示不对齐）
+OSS_URL_CACHE_SIZE = int(os.getenv('OSS_URL_CACHE_SIZE', 10000))
+OSS_URL_EXPIRY_WINDOW = int(os.getenv('OSS_URL_EXPIRY_WINDOW', 300))
+
+# 分享访问次数缓冲：大于 0 时在缓存中计数并每累计 N 次写回数据库，0 表示每次直接写库
+DROP_DOWNLOAD_BUFFER = int(os.getenv('DROP_DOWNLOAD_BUFFER', 0))
+
+# 分享码解析结果缓存时间（秒），不会超过分享的剩余有效期
+DROP_CACHE_TIMEOUT = int(os.getenv('DROP_CACHE_TIMEOUT', 300))
+
+# 缓存：配置 REDIS_URL 时使用 Redis 作为共享缓存，多进程/多节点部署时需要配置
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# 上传会话存储：db（数据库表，默认，多 worker 安全）或 cache（需要配置共享缓存）
+UPLOAD_SESSION_BACKEND = os.getenv('UPLOAD_SESSION_BACKEND', 'db')
+
+# 读接口用户缓存时间（秒），用户信息与已用空间变化时主动失效
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv('AUTH_USER_CACHE_TIMEOUT', 60))
+
+# 进程内令牌黑名单集合的同步间隔（秒），0（默认）表示每次刷新都查询黑名单表；
+# 大于 0 时其他进程拉黑（注销、轮换）的 refresh token 在同步前仍可在本进程使用
+TOKEN_BLACKLIST_SYNC_INTERVAL = int(os.getenv('TOKEN_BLACKLIST_SYNC_INTERVAL', 0))
+
+# 分片上传：默认分片大小（字节）与会话/配额预留有效期（秒）
+MULTIPART_PART_SIZE = int(os.getenv('MULTIPART_PART_SIZE', 8 * 1024 * 1024))
+MULTIPART_UPLOAD_TIMEOUT = int(os.getenv('MULTIPART_UPLOAD_TIMEOUT', 24 * 3600))
+
+# 回收站保留天数，超过后由 purge_deleted 物理删除
+TRASH_RETENTION_DAYS = int(os.getenv('TRASH_RETENTION_DAYS', 30))
+
+# 打包下载时提前并发读取的 OSS 对象数（需小于 OSS_POOL_SIZE）
+ZIP_PREFETCH = int(os.getenv('ZIP_PREFETCH', 4))
+
+# 代理下载：每个用户（匿名访问按IP）同时进行的下载数上限（0 表示关闭代理下载）、
+# 转发分块大小（字节）与并发计数的有效期（秒）
+PROXY_DOWNLOAD_CONCURRENCY = int(os.getenv('PROXY_DOWNLOAD_CONCURRENCY', 4))
+PROXY_CHUNK_SIZE = int(os.getenv('PROXY_CHUNK_SIZE', 256 * 1024))
+PROXY_DOWNLOAD_SLOT_TIMEOUT = int(os.getenv('PROXY_DOWNLOAD_SLOT_TIMEOUT', 6 * 3600))
@@ -19,6 +19,7 @@ from django.urls import re_path, include
 from rest_framework.routers import DefaultRouter
 from cloud_auth.views import UserAuthViewSet, UserSettingsViewSet
 from cloud_file.views import FileViewSet, DropViewSet
+from cloud_file import async_views
 
 router = DefaultRouter()
 router.register(r'user', UserAuthViewSet, basename='user')
@@ -28,5 +29,11 @@ router.register(r'drop', DropViewSet, basename='drop')
 
 urlpatterns = [
     re_path(r'django-admin/', admin.site.urls),
+    # 异步接口（ASGI 部署时使用）
+    re_path(r'^async/file/list/$', async_views.list_files),
+    re_path(r'^async/file/(?P<pk>[^/.]+)/download/$', async_views.download_file),
+    re_path(r'^async/file/get-token/$', async_views.get_upload_token),
+    re_path(r'^async/file/uploaded/$', async_views.uploaded),
+    re_path(r'^async/drop/get-drop/$', async_views.get_drop),
     re_path(r'^', include(router.urls)),
 ]
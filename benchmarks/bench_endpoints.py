@@ -0,0 +1,91 @@
+"""
+对比 WSGI 与 ASGI 部署下热点接口的吞吐量与延迟（仅依赖标准库）
+
+示例：
+
+    # WSGI
+    gunicorn CloudBackend.wsgi -w 4 --threads 8 -b 127.0.0.1:8000
+    # ASGI
+    uvicorn CloudBackend.asgi:application --workers 4 --port 8001
+
+    python benchmarks/bench_endpoints.py --token <access_token> \\
+        --url wsgi=http://127.0.0.1:8000/file/list/ \\
+        --url asgi=http://127.0.0.1:8001/async/file/list/ \\
+        --body '{"path": "/"}' --concurrency 500 --requests 20000
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def send(url, body, token, timeout):
+    request = urllib.request.Request(url, data=body, method='POST', headers={'Content-Type': 'application/json'})
+    if token:
+        request.add_header('Authorization', f'Bearer {token}')
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            ok = response.status < 400
+    except (urllib.error.URLError, OSError):
+        ok = False
+    return time.perf_counter() - started, ok
+
+
+def run(url, body, token, concurrency, total, timeout):
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def task(_):
+        nonlocal errors
+        elapsed, ok = send(url, body, token, timeout)
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(task, range(total)))
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': total,
+        'errors': errors,
+        'rps': total / duration,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p99_ms': latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        'max_ms': latencies[-1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', action='append', required=True, help='name=url，可重复指定以对比多个部署')
+    parser.add_argument('--token', help='JWT access token')
+    parser.add_argument('--body', default='{}', help='JSON 请求体')
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--timeout', type=float, default=30)
+    args = parser.parse_args()
+
+    body = json.dumps(json.loads(args.body)).encode()
+    print(f"{'name':<10}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for spec in args.url:
+        name, _, url = spec.partition('=')
+        result = run(url, body, args.token, args.concurrency, args.requests, args.timeout)
+        print(
+            f"{name:<10}{result['requests']:>10}{result['errors']:>8}{result['rps']:>10.1f}"
+            f"{result['p50_ms']:>10.1f}{result['p99_ms']:>10.1f}{result['max_ms']:>10.1f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
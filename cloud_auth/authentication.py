@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import User
+from .tokens import TOKEN_VERSION_CLAIM
+
+
+# 密码哈希不进入缓存，重建的实例中 password 为延迟加载字段
+USER_FIELDS = [field.attname for field in User._meta.concrete_fields if field.attname != 'password']
+
+
+def cache_key(user_id):
+    return f"auth_user_{user_id}"
+
+
+def invalidate_user(*user_ids):
+    """
+    在当前事务提交后删除用户缓存（用户信息、配额或已用空间变化时调用）
+    """
+    keys = [cache_key(user_id) for user_id in set(user_ids)]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    从缓存中解析 JWT 对应的用户，命中时不查询用户表
+
+    缓存按用户ID存储，令牌中的 token_version 与缓存的版本不一致时拒绝请求；
+    未携带 token_version 的旧令牌回退到 JWTAuthentication 的查库逻辑
+    """
+
+    def get_user(self, validated_token):
+        version = validated_token.get(TOKEN_VERSION_CLAIM)
+        if version is None:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        row = cache.get(cache_key(user_id))
+        if row is None:
+            row = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values(*USER_FIELDS).first()
+            if row is None:
+                raise AuthenticationFailed('User not found', code='user_not_found')
+            cache.set(cache_key(user_id), row, timeout=settings.AUTH_USER_CACHE_TIMEOUT)
+
+        if row['token_version'] != version:
+            raise AuthenticationFailed('Token has been revoked', code='token_revoked')
+        if not row['is_active']:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+
+        return User.from_db('default', USER_FIELDS, [row[field] for field in USER_FIELDS])
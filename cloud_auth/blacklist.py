@@ -0,0 +1,51 @@
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+
+class BlacklistFilter:
+    """
+    进程内的已拉黑 JTI 集合，用于在刷新令牌时跳过绝大多数（未拉黑的）黑名单查询
+
+    按 BlacklistedToken 的自增主键每隔 sync_interval 秒增量同步一次，本进程拉黑的
+    令牌立即加入；其他进程拉黑的令牌最多延迟 sync_interval 秒生效（重放窗口），因此
+    默认关闭（sync_interval <= 0 时每次都查询黑名单表）。已过期的 JTI 在同步时移除
+    （过期令牌本身无法通过校验），集合大小以未过期的黑名单令牌数为上限
+    """
+
+    def __init__(self, sync_interval):
+        self.sync_interval = sync_interval
+        self.lock = threading.Lock()
+        self.jtis = {}
+        self.last_id = 0
+        self.synced_at = None
+
+    def _sync(self):
+        now = timezone.now()
+        rows = BlacklistedToken.objects.filter(id__gt=self.last_id, token__expires_at__gt=now).order_by('id')
+        for blacklisted_id, jti, expires_at in rows.values_list('id', 'token__jti', 'token__expires_at'):
+            self.jtis[jti] = expires_at
+            self.last_id = blacklisted_id
+        self.jtis = {jti: expires_at for jti, expires_at in self.jtis.items() if expires_at > now}
+        self.synced_at = time.monotonic()
+
+    def might_contain(self, jti):
+        """
+        返回 False 时该令牌一定未被拉黑（同步延迟内的其他进程拉黑除外）
+        """
+        if self.sync_interval <= 0:
+            return True
+        with self.lock:
+            if self.synced_at is None or time.monotonic() - self.synced_at >= self.sync_interval:
+                self._sync()
+            return jti in self.jtis
+
+    def add(self, jti, expires_at):
+        with self.lock:
+            self.jtis[jti] = expires_at
+
+
+blacklist_filter = BlacklistFilter(settings.TOKEN_BLACKLIST_SYNC_INTERVAL)
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+
+class Command(BaseCommand):
+    help = '分批删除已过期的 OutstandingToken 及其 BlacklistedToken 记录'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--sleep', type=float, default=0, help='每批之间暂停的秒数')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        total = 0
+        while True:
+            ids = list(
+                OutstandingToken.objects.filter(expires_at__lte=now)
+                .values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            total += OutstandingToken.objects.filter(id__in=ids).delete()[0]
+            if len(ids) < options['batch_size']:
+                break
+            if options['sleep']:
+                time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(f'pruned {total} expired tokens'))
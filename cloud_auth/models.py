@@ -15,4 +15,7 @@ class User(AbstractUser):
     is_active = models.BooleanField(default=True)
     permission = models.OneToOneField(Permission, on_delete=models.PROTECT, null=True, blank=True)
     quota = models.BigIntegerField(default=10 * 1024 * 1024 * 1024)
-    used_space = models.BigIntegerField(default=0)
\ No newline at end of file
+    used_space = models.BigIntegerField(default=0)
+    reserved_space = models.BigIntegerField(default=0)
+    # 修改密码时递增，使已签发的令牌失效
+    token_version = models.IntegerField(default=0)
\ No newline at end of file
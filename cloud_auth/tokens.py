@@ -0,0 +1,47 @@
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .blacklist import blacklist_filter
+from .models import User
+
+
+# 令牌中记录签发时用户 token_version 的声明，修改密码后旧令牌失效
+TOKEN_VERSION_CLAIM = 'ver'
+
+
+class VersionedRefreshToken(RefreshToken):
+    """
+    携带 token_version 声明的刷新令牌，由其生成的 access token 会复制该声明
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[TOKEN_VERSION_CLAIM] = user.token_version
+        return token
+
+
+class FilteredRefreshToken(VersionedRefreshToken):
+    """
+    先查询进程内黑名单集合，只有可能已被拉黑时才查询 BlacklistedToken 表
+    """
+
+    def check_blacklist(self):
+        if blacklist_filter.might_contain(self.payload[api_settings.JTI_CLAIM]):
+            super().check_blacklist()
+
+    def blacklist(self):
+        result = super().blacklist()
+        blacklist_filter.add(self.payload[api_settings.JTI_CLAIM], datetime_from_epoch(self.payload['exp']))
+        return result
+
+
+def token_version_valid(token):
+    """
+    检查令牌的 token_version 是否与用户当前版本一致，未携带该声明的旧令牌视为有效
+    """
+    version = token.get(TOKEN_VERSION_CLAIM)
+    if version is None:
+        return True
+    return User.objects.filter(pk=token['user_id'], token_version=version).exists()
@@ -2,13 +2,15 @@ from rest_framework import viewsets
 from rest_framework.response import Response
 from .models import User
 from .serializers import UserSerializer, UserAuthSerializer
+from .authentication import CachedJWTAuthentication, invalidate_user
+from .tokens import FilteredRefreshToken, VersionedRefreshToken, token_version_valid
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import AuthenticationFailed
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenRefreshView
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework.viewsets import GenericViewSet
+from cloud_file.oss_utils import SHARED_OBJECT_PREFIX
 
 # Create your views here.
 
@@ -35,7 +37,7 @@ class UserAuthViewSet(viewsets.ModelViewSet):
             user = User.objects.get(username=username)
             if user.check_password(password) and user.is_active:
                 # 生成JWT token
-                refresh = RefreshToken.for_user(user)
+                refresh = VersionedRefreshToken.for_user(user)
                 serializer = self.get_serializer(user)
                 return Response({
                     'user': serializer.data,
@@ -57,6 +59,10 @@ class UserAuthViewSet(viewsets.ModelViewSet):
         serializer = UserAuthSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
+        # 用户名同时作为OSS对象前缀，不能与共享对象前缀冲突
+        if f"{serializer.validated_data['username']}/".startswith(SHARED_OBJECT_PREFIX):
+            return Response({'error': 'Username is reserved'}, status=400)
+
         # 检查用户名是否已存在
         if User.objects.filter(username=request.data.get('username')).exists():
             return Response({'error': 'Username already exists'}, status=400)
@@ -77,9 +83,9 @@ class UserAuthViewSet(viewsets.ModelViewSet):
         )
         user.display_name = serializer.validated_data.get('display_name', serializer.validated_data['username'])
         user.permission = user_permission
-        user.save()
+        user.save(update_fields=['display_name', 'permission'])
 
-        refresh = RefreshToken.for_user(user)
+        refresh = VersionedRefreshToken.for_user(user)
 
         return Response({
             'user': UserAuthSerializer(user).data,
@@ -91,7 +97,8 @@ class UserAuthViewSet(viewsets.ModelViewSet):
         detail=False,
         methods=['get'],
         url_path='profile',
-        permission_classes=[IsAuthenticated]
+        permission_classes=[IsAuthenticated],
+        authentication_classes=[CachedJWTAuthentication]
     )
     def profile(self, request):
         user = request.user
@@ -108,7 +115,7 @@ class UserAuthViewSet(viewsets.ModelViewSet):
         try:
             refresh_token = request.data.get("refresh")
             if refresh_token:
-                token = RefreshToken(refresh_token)
+                token = FilteredRefreshToken(refresh_token)
                 token.blacklist()
             return Response({'status': 'Success'}, status=200)
         except Exception as e:
@@ -126,7 +133,9 @@ class UserAuthViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Require refresh token'}, status=400)
         
         try:
-            refresh = RefreshToken(refresh_token)
+            refresh = FilteredRefreshToken(refresh_token)
+            if not token_version_valid(refresh):
+                return Response({'error': 'Uneffective token'}, status=401)
             access_token = refresh.access_token
             return Response({
                 'access': str(access_token),
@@ -153,8 +162,18 @@ class UserSettingsViewSet(GenericViewSet):
             return Response({'error': 'old_password error'}, status=400)
 
         user.set_password(new_password)
-        user.save()
-        return Response({'status': 'Success'}, status=200)
+        user.token_version += 1
+        # 只写回修改的字段：request.user 读取于认证时，整行保存会覆盖并发上传对 used_space/reserved_space 的更新
+        user.save(update_fields=['password', 'token_version'])
+        invalidate_user(user.id)
+
+        # 旧令牌已失效，返回新令牌
+        refresh = VersionedRefreshToken.for_user(user)
+        return Response({
+            'status': 'Success',
+            'access': str(refresh.access_token),
+            'refresh': str(refresh),
+        }, status=200)
     
     @action(
         detail=False,
@@ -171,7 +190,8 @@ class UserSettingsViewSet(GenericViewSet):
         else:   
             user.display_name = user.username
 
-        user.save()
+        user.save(update_fields=['display_name'])
+        invalidate_user(user.id)
         return Response({'status', 'Success'}, status=200)
     
     @action(
@@ -189,7 +209,8 @@ class UserSettingsViewSet(GenericViewSet):
             if User.objects.filter(email=email).exclude(id=user.id).exists():
                 return Response({'error': 'email already exists'}, status=400)
             user.email = email
-            user.save()
+            user.save(update_fields=['email'])
+            invalidate_user(user.id)
             return Response({'status', 'Success'}, status=200)
         else:
             return Response({'error': 'Email is neccessary'}, status=400)
\ No newline at end of file
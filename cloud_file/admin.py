@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import File, Drop
+from .models import File, Drop, OSSJob, StoredObject
 
 # Register your models here.
 @admin.register(File)
@@ -16,4 +16,19 @@ class DropAdmin(admin.ModelAdmin):
     search_fields = ('code', 'user__username', 'user__email')
     list_filter = ('expire_days', 'is_expired', 'require_login', 'created_at')
     readonly_fields = ('id', 'created_at', 'is_expired', 'download_count')
-    ordering = ('-id',)
\ No newline at end of file
+    ordering = ('-id',)
+
+@admin.register(OSSJob)
+class OSSJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'attempts', 'run_after', 'locked_by', 'created_at')
+    list_filter = ('kind', 'status')
+    readonly_fields = ('id', 'created_at', 'locked_by', 'locked_at', 'last_error')
+    ordering = ('-id',)
+
+@admin.register(StoredObject)
+class StoredObjectAdmin(admin.ModelAdmin):
+    list_display = ('id', 'sha256', 'size', 'ref_count', 'verified', 'created_at')
+    search_fields = ('sha256',)
+    list_filter = ('verified',)
+    readonly_fields = ('id', 'created_at')
+    ordering = ('-id',)
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CloudFileConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cloud_file'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from .search import ensure_fts_index
+
+        post_migrate.connect(ensure_fts_index, sender=self)
@@ -0,0 +1,270 @@
+"""
+热点文件接口的异步实现，部署在 ASGI（CloudBackend/asgi.py）下使用
+
+读路径使用 Django 异步 ORM；包含事务的写路径（配额预留/转换、创建记录、分享计数）
+通过 sync_to_async 在线程中执行，与同步接口共用同一套逻辑。OSS 签名为纯本地计算，
+不发起网络请求，直接在事件循环中执行
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from cloud_auth.authentication import CachedJWTAuthentication
+from . import dedup
+from . import drop_cache
+from . import upload_sessions
+from .drop_counters import count_download
+from .models import File
+from .oss_utils import get_oss_client
+from .pagination import InvalidCursor, akeyset_page
+from .serializers import DropSerializer, FILE_LIST_FIELDS, serialize_file_rows
+from .views import (
+    complete_upload, drop_access_error, instant_upload_result, issue_upload_token, parse_file_size, validate_file_name,
+)
+
+
+authenticator = CachedJWTAuthentication()
+
+
+def async_api(require_login=True):
+    """
+    异步接口装饰器：只接受 POST，解析 JSON 请求体并完成 JWT 认证
+
+    被装饰的视图签名为 view(request, data, *args, **kwargs)，request.user 为认证后的用户
+    """
+    def decorator(view):
+        async def wrapper(request, *args, **kwargs):
+            if request.method != 'POST':
+                return api_response({'detail': f'Method "{request.method}" not allowed.'}, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+            try:
+                data = json.loads(request.body or b'{}')
+            except ValueError:
+                return api_response({'detail': 'JSON parse error'}, status.HTTP_400_BAD_REQUEST)
+            if not isinstance(data, dict):
+                return api_response({'detail': 'JSON object expected'}, status.HTTP_400_BAD_REQUEST)
+
+            try:
+                result = await sync_to_async(authenticator.authenticate)(request)
+            except (AuthenticationFailed, InvalidToken) as e:
+                return api_response({'detail': str(e.detail)}, status.HTTP_401_UNAUTHORIZED)
+            request.user = result[0] if result else AnonymousUser()
+
+            if require_login and not request.user.is_authenticated:
+                return api_response({'detail': 'Authentication credentials were not provided.'}, status.HTTP_401_UNAUTHORIZED)
+
+            try:
+                return await view(request, data, *args, **kwargs)
+            except Exception as e:
+                return api_response({'error': str(e), 'message': 'Failed'}, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        # 认证使用请求头中的 JWT，与 DRF 接口一样不做 CSRF 校验
+        wrapper.csrf_exempt = True
+        wrapper.__name__ = view.__name__
+        wrapper.__doc__ = view.__doc__
+        return wrapper
+    return decorator
+
+
+def api_response(data, status_code=status.HTTP_200_OK):
+    return JsonResponse(data, status=status_code, encoder=JSONEncoder, json_dumps_params={'ensure_ascii': False})
+
+
+@async_api()
+async def list_files(request, data):
+    """
+    根据路径获取文件列表（键集分页）
+    """
+    user = request.user
+    queryset = File.objects.children_of(user, data.get('path', '/')).values(*FILE_LIST_FIELDS)
+    try:
+        files, next_cursor = await akeyset_page(
+            queryset,
+            sort=data.get('sort', 'name'),
+            cursor=data.get('cursor'),
+            page_size=data.get('page_size'),
+        )
+    except InvalidCursor as e:
+        return api_response({
+            'error': str(e),
+            'message': 'Invalid pagination parameters'
+        }, status.HTTP_400_BAD_REQUEST)
+
+    return api_response({
+        'files': list(serialize_file_rows(files)),
+        'next_cursor': next_cursor,
+        'quota': user.quota,
+        'used_space': user.used_space,
+        'message': 'Success'
+    })
+
+
+@async_api(require_login=False)
+async def download_file(request, data, pk):
+    """
+    获取文件下载链接（可通过分享码访问）
+    """
+    code = data.get('code', '')
+    password = data.get('password', '')
+
+    if code:
+        resolved = await sync_to_async(drop_cache.get_drop)(code)
+        if resolved is None:
+            return api_response({'error': 'Invalid code'}, status.HTTP_404_NOT_FOUND)
+        drop, files = resolved
+
+        error = drop_access_error(drop, request.user, password)
+        if error:
+            message, error_status = error
+            return api_response({'error': message}, error_status)
+
+        file = next((row for row in files if str(row['id']) == str(pk)), None)
+        if file is None:
+            return api_response({'error': 'File not found in this drop'}, status.HTTP_404_NOT_FOUND)
+
+    else:
+        if not request.user.is_authenticated:
+            return api_response({'error': 'Please login'}, status.HTTP_401_UNAUTHORIZED)
+
+        file = await File.objects.filter(pk=pk, user=request.user, is_deleted=False).values('content_type', 'oss_url').afirst()
+        if file is None:
+            return api_response({'error': 'File not found'}, status.HTTP_404_NOT_FOUND)
+
+    if file['content_type'] == 'folder':
+        return api_response({'error': 'You cannot download a folder'}, status.HTTP_400_BAD_REQUEST)
+
+    return api_response({
+        'download_url': get_oss_client().generate_download_url(file['oss_url']),
+        'message': 'Success'
+    })
+
+
+@async_api()
+async def get_upload_token(request, data):
+    """
+    获取阿里云OSS上传token
+    """
+    file_name = data.get('file_name')
+    file_size = data.get('file_size')
+
+    if not all([file_name, file_size]):
+        return api_response({'error': 'Need file_name and file_size'}, status.HTTP_400_BAD_REQUEST)
+
+    try:
+        file_name = validate_file_name(file_name)
+        file_size = parse_file_size(file_size)
+    except ValueError as e:
+        return api_response({'error': str(e)}, status.HTTP_400_BAD_REQUEST)
+
+    try:
+        sha256 = dedup.normalize_sha256(data.get('sha256'))
+    except ValueError as e:
+        return api_response({'error': str(e)}, status.HTTP_400_BAD_REQUEST)
+
+    # 秒传流程与同步接口相同（持有证明挑战 / 校验证明后直接创建文件记录）
+    if sha256:
+        result = await sync_to_async(instant_upload_result)(
+            request.user, data, sha256, file_name, file_size, data.get('content_type'),
+        )
+        if result is not None:
+            return api_response(*result)
+
+    issued = await sync_to_async(issue_upload_token)(request.user, file_name, file_size, data.get('content_type'), sha256)
+    if issued is None:
+        return api_response({'error': 'Storage quota exceeded'}, status.HTTP_400_BAD_REQUEST)
+    upload_id, upload_token = issued
+
+    return api_response({
+        'token': upload_token,
+        'upload_id': upload_id,
+        'message': 'Success'
+    })
+
+
+@async_api()
+async def uploaded(request, data):
+    """
+    完成客户端上传后创建文件记录
+    """
+    user = request.user
+    upload_id = data.get('upload_id')
+    if not upload_id:
+        return api_response({
+            'error': 'upload_id is required',
+            'message': 'Missing upload_id'
+        }, status.HTTP_400_BAD_REQUEST)
+
+    sessions = await sync_to_async(upload_sessions.get_store().get_many)([upload_id])
+    session = sessions.get(upload_id)
+    if not session:
+        return api_response({
+            'error': 'Invalid or expired upload_id',
+            'message': 'Upload session not found'
+        }, status.HTTP_400_BAD_REQUEST)
+
+    if session['user'] != user.id:
+        return api_response({
+            'error': 'Permission denied',
+            'message': 'Upload session belongs to different user'
+        }, status.HTTP_403_FORBIDDEN)
+
+    if session.get('multipart'):
+        return api_response({'error': 'Use multipart/complete for multipart uploads'}, status.HTTP_400_BAD_REQUEST)
+
+    oss_url = data.get('oss_url')
+    if not oss_url:
+        return api_response({
+            'error': 'oss_url is required',
+            'message': 'Missing oss_url'
+        }, status.HTTP_400_BAD_REQUEST)
+    oss_key = f"{user.username}/{oss_url.split(f'/{user.username}/')[-1]}"
+
+    if not await sync_to_async(complete_upload)(user, session, oss_url, oss_key, data.get('path', '/')):
+        return api_response({
+            'error': 'Storage quota exceeded after upload',
+            'message': 'Insufficient storage space'
+        }, status.HTTP_400_BAD_REQUEST)
+
+    return api_response({'message': 'File uploaded successfully'}, status.HTTP_201_CREATED)
+
+
+@async_api(require_login=False)
+async def get_drop(request, data):
+    """
+    获取分享详情
+    """
+    code = data.get('code', '')
+    password = data.get('password', '')
+
+    if data.get('require_login', False) and not request.user.is_authenticated:
+        return api_response({'error': 'Please login'}, status.HTTP_401_UNAUTHORIZED)
+
+    if not code:
+        return api_response({'error': 'Need sharing code'}, status.HTTP_400_BAD_REQUEST)
+
+    resolved = await sync_to_async(drop_cache.get_drop)(code)
+    if resolved is None:
+        return api_response({'error': 'Invalid code'}, status.HTTP_404_NOT_FOUND)
+    drop, files = resolved
+
+    error = drop_access_error(drop, request.user, password)
+    if error:
+        message, error_status = error
+        return api_response({'error': message}, error_status)
+
+    download_count = await sync_to_async(count_download)(drop)
+    if download_count is None:
+        return api_response({'error': 'Download limit exceeded'}, status.HTTP_400_BAD_REQUEST)
+    drop.download_count = download_count
+
+    return api_response({
+        'drop': DropSerializer(drop).data,
+        'files': list(serialize_file_rows(files)),
+        'message': 'Success'
+    })
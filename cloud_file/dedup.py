@@ -0,0 +1,140 @@
+import hashlib
+import hmac
+import re
+import secrets
+from collections import defaultdict
+
+from django.core import signing
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .jobs import enqueue_verify_object
+from .models import StoredObject
+from .oss_utils import SHARED_OBJECT_PREFIX, get_oss_client, oss_key_from_url
+
+
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+# 秒传持有证明：客户端需提交服务端随机指定区间内容的 SHA-256
+PROOF_RANGE_SIZE = 64 * 1024
+CHALLENGE_MAX_AGE = 300
+CHALLENGE_SALT = 'cloud_file.dedup.challenge'
+
+
+def normalize_sha256(value):
+    """
+    校验客户端提交的 SHA-256（十六进制），未提交时返回 None
+    """
+    if not value:
+        return None
+    value = str(value).strip().lower()
+    if not SHA256_PATTERN.match(value):
+        raise ValueError('sha256 must be 64 hex characters')
+    return value
+
+
+def find(sha256, size):
+    """
+    查找可供秒传引用的共享对象：已验证且已复制到共享前缀下，不存在时返回 None
+    """
+    blob = StoredObject.objects.filter(sha256=sha256, size=size, verified=True).first()
+    if blob is None or not oss_key_from_url(blob.oss_url).startswith(SHARED_OBJECT_PREFIX):
+        return None
+    return blob
+
+
+def issue_challenge(user_id, blob):
+    """
+    为秒传生成持有证明挑战：随机选取对象中的一段区间，客户端需提交该区间内容的 SHA-256
+
+    Returns:
+        dict: {'token': 签名后的挑战, 'offset': 起始字节, 'length': 区间长度}
+    """
+    length = min(blob.size, PROOF_RANGE_SIZE)
+    offset = secrets.randbelow(blob.size - length + 1)
+    token = signing.dumps(
+        {'user': user_id, 'sha256': blob.sha256, 'offset': offset, 'length': length},
+        salt=CHALLENGE_SALT,
+    )
+    return {'token': token, 'offset': offset, 'length': length}
+
+
+def check_proof(user_id, sha256, size, token, proof):
+    """
+    校验秒传持有证明，通过时返回对应的共享对象，否则返回 None
+
+    挑战由服务端签名并绑定用户与哈希，有效期 CHALLENGE_MAX_AGE 秒；
+    按挑战区间从共享对象读取内容计算哈希并与客户端提交的结果比较
+    """
+    try:
+        challenge = signing.loads(token, salt=CHALLENGE_SALT, max_age=CHALLENGE_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    if challenge['user'] != user_id or challenge['sha256'] != sha256 or not isinstance(proof, str):
+        return None
+
+    blob = find(sha256, size)
+    if blob is None:
+        return None
+
+    start, end = challenge['offset'], challenge['offset'] + challenge['length'] - 1
+    response = get_oss_client().get_object(oss_key_from_url(blob.oss_url), headers={'Range': f"bytes={start}-{end}"})
+    with response:
+        if response.status_code not in (200, 206):
+            return None
+        digest = hashlib.sha256()
+        received = 0
+        for chunk in response.iter_content(PROOF_RANGE_SIZE):
+            # 不支持 Range 时返回整个对象，只取区间部分
+            if response.status_code == 200:
+                chunk = chunk[max(start - received, 0):max(end + 1 - received, 0)]
+                received += PROOF_RANGE_SIZE
+            digest.update(chunk)
+    if not hmac.compare_digest(digest.hexdigest(), proof.strip().lower()):
+        return None
+    return blob
+
+
+def acquire(blob):
+    """
+    为秒传引用一个已通过持有证明的共享对象，对象已被删除时返回 False
+
+    使用条件 UPDATE（ref_count > 0）增加引用，与并发删除最后一个引用不会冲突
+    """
+    return bool(StoredObject.objects.filter(pk=blob.pk, ref_count__gt=0).update(ref_count=F('ref_count') + 1))
+
+
+def register(sha256, oss_url, size):
+    """
+    将新上传的对象登记为待验证的共享对象（引用数为 1），并登记后台校验任务
+
+    已存在相同哈希的对象时不登记，返回 None，文件按独立对象处理
+    """
+    if StoredObject.objects.filter(sha256=sha256).exists():
+        return None
+    try:
+        with transaction.atomic():
+            blob = StoredObject.objects.create(sha256=sha256, oss_url=oss_url, size=size, ref_count=1)
+    except IntegrityError:
+        return None
+    enqueue_verify_object(blob.pk)
+    return blob
+
+
+def release(blob_counts):
+    """
+    释放共享对象的引用，返回引用数归零、需要删除的OSS对象路径列表
+
+    Args:
+        blob_counts: {共享对象ID: 释放的引用数}
+    """
+    by_count = defaultdict(list)
+    for blob_id, count in blob_counts.items():
+        by_count[count].append(blob_id)
+    for count, blob_ids in by_count.items():
+        StoredObject.objects.filter(pk__in=blob_ids).update(ref_count=F('ref_count') - count)
+
+    dead = StoredObject.objects.filter(pk__in=list(blob_counts), ref_count__lte=0)
+    oss_keys = [oss_key_from_url(oss_url) for oss_url in dead.values_list('oss_url', flat=True)]
+    dead.delete()
+    return oss_keys
@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Drop, File
+from .serializers import FILE_LIST_FIELDS
+
+
+DROP_FIELDS = [field.attname for field in Drop._meta.concrete_fields]
+
+
+def cache_key(code):
+    return f"drop_code_{code}"
+
+
+def get_drop(code):
+    """
+    按分享码读取分享及其文件列表（读穿缓存），分享不存在时返回 None
+
+    Returns:
+        tuple: (Drop 实例, 文件行列表)，文件行格式与 .values(*FILE_LIST_FIELDS) 相同
+    """
+    entry = cache.get(cache_key(code))
+    if entry is None:
+        drop_row = Drop.objects.filter(code=code, is_deleted=False).values(*DROP_FIELDS).first()
+        if drop_row is None:
+            return None
+        files = list(File.objects.filter(drop=drop_row['id'], is_deleted=False).values(*FILE_LIST_FIELDS))
+        entry = {'drop': drop_row, 'files': files}
+
+        # 缓存时间不超过分享的剩余有效期
+        timeout = min(settings.DROP_CACHE_TIMEOUT, int((drop_row['expire_time'] - timezone.now()).total_seconds()))
+        if timeout > 0:
+            cache.set(cache_key(code), entry, timeout=timeout)
+
+    drop = Drop(**entry['drop'])
+    drop._state.adding = False
+    drop._state.db = 'default'
+    return drop, [dict(row) for row in entry['files']]
+
+
+def invalidate(codes):
+    """
+    在当前事务提交后删除分享缓存
+    """
+    keys = [cache_key(code) for code in set(codes)]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def codes_for_files(files):
+    """
+    包含给定文件（id 列表或 File 查询集）的有效分享的分享码
+    """
+    return list(
+        Drop.objects.filter(files__in=files, is_deleted=False)
+        .values_list('code', flat=True)
+        .distinct()
+    )
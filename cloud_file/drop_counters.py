@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Drop
+
+
+def count_key(drop_id):
+    return f"drop_downloads_{drop_id}"
+
+
+def pending_key(drop_id):
+    return f"drop_downloads_pending_{drop_id}"
+
+
+def count_download(drop):
+    """
+    为分享记录一次访问，返回计数后的访问次数，超过最大次数时返回 None
+
+    默认使用一条条件 UPDATE 同时完成校验与计数：
+    UPDATE ... SET download_count = download_count + 1 WHERE download_count < max_download_count
+
+    配置 DROP_DOWNLOAD_BUFFER > 0 时改为在缓存中原子计数，累计到阈值后批量写回数据库，
+    多进程部署时需要配置共享缓存（如 Redis）才能保证次数限制准确
+    """
+    buffer_size = settings.DROP_DOWNLOAD_BUFFER
+    if buffer_size <= 0:
+        updated = Drop.objects.filter(
+            pk=drop.pk,
+            download_count__lt=F('max_download_count'),
+        ).update(download_count=F('download_count') + 1)
+        if not updated:
+            return None
+        return Drop.objects.filter(pk=drop.pk).values_list('download_count', flat=True).first()
+
+    timeout = max(int((drop.expire_time - timezone.now()).total_seconds()), 1)
+    # 首次访问时以数据库中的次数为起点
+    cache.add(count_key(drop.pk), drop.download_count, timeout=timeout)
+    download_count = cache.incr(count_key(drop.pk))
+    if download_count > drop.max_download_count:
+        return None
+
+    cache.add(pending_key(drop.pk), 0, timeout=None)
+    if cache.incr(pending_key(drop.pk)) >= buffer_size:
+        flush_downloads(drop.pk)
+    return download_count
+
+
+def flush_downloads(drop_id):
+    """
+    将缓存中累计的访问次数写回数据库，返回写回的次数
+
+    并发写回时每次计数只会被其中一次取走，不会重复写入数据库
+    """
+    pending = cache.get(pending_key(drop_id)) or 0
+    if pending <= 0:
+        return 0
+    # 先原子扣减再写库，期间新增的计数会保留到下一次写回
+    try:
+        remaining = cache.decr(pending_key(drop_id), pending)
+    except ValueError:
+        return 0
+    if remaining < 0:
+        # 并发写回已取走了部分计数：只写回本次实际取走的数量，多扣的部分归还
+        claimed = max(pending + remaining, 0)
+        cache.incr(pending_key(drop_id), pending - claimed)
+        pending = claimed
+    if pending:
+        Drop.objects.filter(pk=drop_id).update(download_count=F('download_count') + pending)
+    return pending
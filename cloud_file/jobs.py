@@ -0,0 +1,186 @@
+import hashlib
+import os
+import socket
+import uuid
+from datetime import timedelta
+
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import File, OSSJob, StoredObject
+from .oss_utils import OSS_DELETE_BATCH_SIZE, SHARED_OBJECT_PREFIX, get_oss_client, oss_key_from_url
+
+
+MAX_ATTEMPTS = 8
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 3600
+# 超过该时间仍处于 running 的任务视为 worker 崩溃，重新领取
+LOCK_TIMEOUT = timedelta(minutes=10)
+
+DELETE_OBJECTS = 'delete_objects'
+VERIFY_OBJECT = 'verify_object'
+ABORT_MULTIPART = 'abort_multipart'
+
+VERIFY_CHUNK_SIZE = 1024 * 1024
+
+
+def delete_objects(payload):
+    get_oss_client().delete_files(payload['keys'])
+
+
+def shared_object_key(blob):
+    """
+    共享对象校验通过后的存放路径，位于只有服务端可写的前缀下
+    """
+    return f"{SHARED_OBJECT_PREFIX}{blob.sha256}/{blob.pk}"
+
+
+def verify_object(payload):
+    """
+    将上传者的对象复制到共享前缀下，流式读取副本计算 SHA-256
+
+    与登记的哈希和大小一致时标记为已验证并将引用指向副本，随后删除原对象（仍被其他文件引用时保留），
+    上传者之后无法再通过原路径改写共享内容；不一致时解除文件与该共享对象的关联
+    （文件继续独占原对象）并删除副本
+    """
+    blob = StoredObject.objects.filter(pk=payload['id'], verified=False).first()
+    if blob is None:
+        return
+
+    client = get_oss_client()
+    source_key = oss_key_from_url(blob.oss_url)
+    target_key = shared_object_key(blob)
+    copied = client.copy_object(source_key, target_key, blob.size)
+    matched = False
+    if copied:
+        # 校验副本而不是原对象：原对象在复制后仍可能被上传者改写
+        response = client.get_object(target_key)
+        with response:
+            if response.status_code == 200:
+                digest = hashlib.sha256()
+                size = 0
+                for chunk in response.iter_content(VERIFY_CHUNK_SIZE):
+                    digest.update(chunk)
+                    size += len(chunk)
+                matched = digest.hexdigest() == blob.sha256 and size == blob.size
+            elif response.status_code != 404:
+                raise Exception(f"OSS get object failed with status {response.status_code}")
+
+    with transaction.atomic():
+        if matched:
+            oss_url = client.object_url(target_key)
+            if StoredObject.objects.filter(pk=blob.pk, verified=False).update(verified=True, oss_url=oss_url):
+                File.objects.filter(blob_id=blob.pk).update(oss_url=oss_url)
+                # 原对象仍被其他文件记录引用时保留（如同一路径被重复上传）
+                if not File.objects.filter(oss_url=blob.oss_url).exists():
+                    enqueue_oss_delete([source_key])
+                return
+        else:
+            File.objects.filter(blob_id=blob.pk).update(blob=None)
+            StoredObject.objects.filter(pk=blob.pk, verified=False).delete()
+        # 校验失败，或共享对象在校验期间已被删除
+        if copied:
+            enqueue_oss_delete([target_key])
+
+
+def abort_multipart(payload):
+    get_oss_client().abort_multipart_upload(payload['key'], payload['upload_id'])
+
+
+JOB_HANDLERS = {
+    DELETE_OBJECTS: delete_objects,
+    VERIFY_OBJECT: verify_object,
+    ABORT_MULTIPART: abort_multipart,
+}
+
+
+def enqueue_oss_delete(object_keys):
+    """
+    登记待删除的OSS对象，与调用方处于同一事务中，按批拆分为多个任务
+    """
+    object_keys = [key for key in object_keys if key]
+    OSSJob.objects.bulk_create([
+        OSSJob(kind=DELETE_OBJECTS, payload={'keys': object_keys[start:start + OSS_DELETE_BATCH_SIZE]})
+        for start in range(0, len(object_keys), OSS_DELETE_BATCH_SIZE)
+    ])
+
+
+def enqueue_verify_object(stored_object_id):
+    """
+    登记共享对象的哈希校验任务
+    """
+    OSSJob.objects.create(kind=VERIFY_OBJECT, payload={'id': stored_object_id})
+
+
+def enqueue_abort_multipart(uploads):
+    """
+    登记待取消的分片上传，删除已上传的分片
+
+    Args:
+        uploads: [(OSS 对象路径, OSS 分片上传ID)]
+    """
+    OSSJob.objects.bulk_create([
+        OSSJob(kind=ABORT_MULTIPART, payload={'key': object_key, 'upload_id': oss_upload_id})
+        for object_key, oss_upload_id in uploads
+    ])
+
+
+def make_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def backoff(attempts):
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS))
+
+
+def claim_jobs(worker_id, batch_size):
+    """
+    领取一批到期任务
+
+    先选出候选 id，再用带 status 条件的 UPDATE 抢占，多个 worker 并发时
+    同一任务只会被一个 worker 领到
+    """
+    now = timezone.now()
+    claimable = (
+        Q(status=OSSJob.Status.PENDING, run_after__lte=now)
+        | Q(status=OSSJob.Status.RUNNING, locked_at__lt=now - LOCK_TIMEOUT)
+    )
+    ids = list(
+        OSSJob.objects.filter(claimable).order_by('run_after').values_list('id', flat=True)[:batch_size]
+    )
+    if not ids:
+        return []
+
+    OSSJob.objects.filter(claimable, id__in=ids).update(
+        status=OSSJob.Status.RUNNING,
+        locked_by=worker_id,
+        locked_at=now,
+    )
+    return list(OSSJob.objects.filter(id__in=ids, status=OSSJob.Status.RUNNING, locked_by=worker_id))
+
+
+def run_job(job):
+    """
+    执行单个任务：成功则删除任务行，失败则按指数退避重新排队，
+    超过最大次数后标记为 failed 保留以便排查
+    """
+    try:
+        handler = JOB_HANDLERS[job.kind]
+        handler(job.payload)
+    except Exception as e:
+        attempts = job.attempts + 1
+        OSSJob.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+            status=OSSJob.Status.FAILED if attempts >= MAX_ATTEMPTS else OSSJob.Status.PENDING,
+            attempts=attempts,
+            run_after=timezone.now() + backoff(attempts),
+            locked_by='',
+            locked_at=None,
+            last_error=str(e)[:2000],
+        )
+        return False
+    else:
+        OSSJob.objects.filter(pk=job.pk, locked_by=job.locked_by).delete()
+        return True
+    finally:
+        close_old_connections()
@@ -0,0 +1,86 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from cloud_file.models import File, normalize_folder_path
+
+
+class Command(BaseCommand):
+    help = '为已有文件记录规范化 path 并回填 parent 外键'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        user_ids = (
+            File.objects.exclude(user__isnull=True)
+            .values_list('user_id', flat=True)
+            .distinct()
+            .order_by('user_id')
+        )
+
+        total_paths = total_parents = total_merged = 0
+        for user_id in user_ids.iterator():
+            with transaction.atomic():
+                paths = self.normalize_paths(user_id, batch_size, dry_run)
+                parents, merged = self.backfill_parents(user_id, batch_size, dry_run)
+            total_paths += paths
+            total_parents += parents
+            total_merged += merged
+
+        prefix = '[dry-run] ' if dry_run else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}normalized {total_paths} paths, updated {total_parents} parents, '
+            f'merged {total_merged} duplicate folders'
+        ))
+
+    def normalize_paths(self, user_id, batch_size, dry_run):
+        """
+        将 NULL / 缺少首尾 "/" 的 path 统一为规范格式
+        """
+        rows = File.objects.filter(user_id=user_id).filter(
+            Q(path__isnull=True) | ~Q(path__startswith='/') | ~Q(path__endswith='/')
+        ).values_list('id', 'path')
+
+        changed = [File(id=file_id, path=normalize_folder_path(path)) for file_id, path in rows.iterator()]
+        if not dry_run:
+            File.objects.bulk_update(changed, ['path'], batch_size=batch_size)
+        return len(changed)
+
+    def backfill_parents(self, user_id, batch_size, dry_run):
+        """
+        根据物化路径计算每条记录所属的文件夹，并合并同一目录下的同名文件夹
+
+        Returns:
+            tuple: (更新 parent 的条数, 合并的重复文件夹数)
+        """
+        folders = {}
+        duplicates = []
+        for folder_id, path, name in File.objects.filter(
+            user_id=user_id, content_type='folder', is_deleted=False
+        ).order_by('id').values_list('id', 'path', 'name').iterator():
+            # 同名文件夹重复时以最早创建的为准，其余合并到该文件夹
+            kept = folders.setdefault(f"{normalize_folder_path(path)}{name}/", folder_id)
+            if kept != folder_id:
+                duplicates.append(folder_id)
+
+        changed = []
+        for file_id, path, parent_id in File.objects.filter(user_id=user_id).values_list(
+            'id', 'path', 'parent_id'
+        ).iterator():
+            expected = folders.get(normalize_folder_path(path))
+            if expected == file_id:
+                expected = None
+            if expected != parent_id:
+                changed.append(File(id=file_id, parent_id=expected))
+
+        if not dry_run:
+            File.objects.bulk_update(changed, ['parent'], batch_size=batch_size)
+            # 子项已按路径归入保留的文件夹，重复的文件夹记录本身不占用空间，直接标记删除
+            File.objects.filter(pk__in=duplicates).update(is_deleted=True, deleted_at=timezone.now())
+        return len(changed), len(duplicates)
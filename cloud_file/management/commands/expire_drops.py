@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from cloud_file import drop_cache
+from cloud_file.models import Drop
+
+
+class Command(BaseCommand):
+    help = '将已超过过期时间的分享批量标记为过期'
+
+    def handle(self, *args, **options):
+        # 命中 (expire_time) WHERE is_expired = false 部分索引的单条 UPDATE
+        expired = Drop.objects.filter(is_expired=False, expire_time__lt=timezone.now())
+        drop_cache.invalidate(expired.values_list('code', flat=True))
+        count = expired.update(is_expired=True)
+        self.stdout.write(self.style.SUCCESS(f'expired {count} drops'))
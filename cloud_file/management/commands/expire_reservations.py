@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from cloud_file.quota import release_expired
+
+
+class Command(BaseCommand):
+    help = '释放已过期的上传配额预留'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            count = release_expired(options['batch_size'])
+            total += count
+            if count < options['batch_size']:
+                break
+        self.stdout.write(self.style.SUCCESS(f'released {total} expired reservations'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from cloud_file.drop_counters import flush_downloads
+from cloud_file.models import Drop
+
+
+class Command(BaseCommand):
+    help = '将缓存中累计的分享访问次数写回数据库（DROP_DOWNLOAD_BUFFER > 0 时使用）'
+
+    def handle(self, *args, **options):
+        total = 0
+        drop_ids = Drop.objects.filter(is_deleted=False, is_expired=False).values_list('id', flat=True)
+        for drop_id in drop_ids.iterator():
+            total += flush_downloads(drop_id)
+        self.stdout.write(self.style.SUCCESS(f'flushed {total} downloads'))
@@ -0,0 +1,72 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from cloud_file.models import Drop, File
+
+
+class Command(BaseCommand):
+    help = '分批物理删除超过保留期的已删除文件与分享'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='保留天数，默认 TRASH_RETENTION_DAYS')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--sleep', type=float, default=0.1, help='每批之间暂停的秒数')
+        parser.add_argument('--dry-run', action='store_true', help='只统计待删除条数')
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else settings.TRASH_RETENTION_DAYS
+        cutoff = timezone.now() - timedelta(days=days)
+        self.batch_size = options['batch_size']
+        self.sleep = options['sleep']
+        dry_run = options['dry_run']
+
+        prefix = '[dry-run] ' if dry_run else ''
+        for model in (Drop, File):
+            stamped = self.stamp_legacy(model, dry_run)
+            expired = model.objects.filter(is_deleted=True, deleted_at__lt=cutoff)
+            purged = expired.count() if dry_run else self.purge(expired)
+            self.stdout.write(self.style.SUCCESS(
+                f'{prefix}{model._meta.verbose_name_plural}: purged {purged}, stamped {stamped} without deleted_at'
+            ))
+
+    def stamp_legacy(self, model, dry_run):
+        """
+        升级前删除、没有 deleted_at 的记录从现在开始计算保留期
+        """
+        legacy = model.objects.filter(is_deleted=True, deleted_at__isnull=True)
+        if dry_run:
+            return legacy.count()
+        now = timezone.now()
+        total = 0
+        while True:
+            ids = list(legacy.values_list('id', flat=True)[:self.batch_size])
+            if not ids:
+                return total
+            total += model.objects.filter(id__in=ids).update(deleted_at=now)
+            self.throttle()
+
+    def purge(self, expired):
+        """
+        每批在独立的短事务中删除，批次之间暂停，避免长时间持有锁
+        """
+        total = 0
+        while True:
+            ids = list(expired.order_by('deleted_at').values_list('id', flat=True)[:self.batch_size])
+            if not ids:
+                return total
+            with transaction.atomic():
+                # 同时删除多对多关联（分享-文件）并置空子项的 parent
+                expired.model.objects.filter(id__in=ids).delete()
+            total += len(ids)
+            if len(ids) < self.batch_size:
+                return total
+            self.throttle()
+
+    def throttle(self):
+        if self.sleep:
+            time.sleep(self.sleep)
@@ -0,0 +1,107 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+
+from cloud_auth.authentication import invalidate_user
+from cloud_auth.models import User
+from cloud_file.models import File
+
+
+# 写回时 used_space 被并发修改的用户最多重新计算的次数
+MAX_ATTEMPTS = 3
+
+
+class Command(BaseCommand):
+    help = '用一次 GROUP BY 汇总所有用户的文件大小，批量修正 used_space'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='只输出差异，不写库')
+        parser.add_argument('--user', action='append', default=[], help='只处理指定用户名，可重复指定')
+        parser.add_argument('--limit', type=int, help='最多修正的用户数')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+        limit = options['limit']
+
+        users = User.objects.order_by('id')
+        files = File.objects.filter(is_deleted=False, content_type__isnull=False).exclude(content_type='folder')
+        if options['user']:
+            users = users.filter(username__in=options['user'])
+            files = files.filter(user__username__in=options['user'])
+
+        # 与用户表按用户ID归并，没有文件的用户用量为 0
+        totals = iter(
+            files.exclude(user__isnull=True)
+            .values('user_id')
+            .annotate(total=Sum('size'))
+            .order_by('user_id')
+            .values_list('user_id', 'total')
+            .iterator()
+        )
+        next_total = next(totals, None)
+
+        scanned = corrected = drift = skipped = 0
+        pending = []
+        for user_id, username, used_space in users.values_list('id', 'username', 'used_space').iterator():
+            while next_total is not None and next_total[0] < user_id:
+                next_total = next(totals, None)
+            total = next_total[1] if next_total is not None and next_total[0] == user_id else 0
+
+            scanned += 1
+            if total == used_space:
+                continue
+
+            corrected += 1
+            drift += total - used_space
+            self.stdout.write(f'{username}: {used_space} -> {total} ({total - used_space:+d})')
+            if not dry_run:
+                pending.append(user_id)
+                if len(pending) >= batch_size:
+                    skipped += self.apply(pending, files)
+                    pending = []
+            if limit is not None and corrected >= limit:
+                break
+
+        if pending:
+            skipped += self.apply(pending, files)
+
+        prefix = '[dry-run] ' if dry_run else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}scanned {scanned} users, corrected {corrected}, total drift {drift:+d} bytes'
+        ))
+        if skipped:
+            self.stdout.write(self.style.WARNING(f'skipped {skipped} users modified concurrently, run again later'))
+
+    def apply(self, user_ids, files):
+        """
+        重新读取一批用户的 used_space 与文件总大小并条件写回，返回重试后仍被并发修改而跳过的用户数
+
+        先读 used_space 再汇总文件：上传/删除在同一事务中同时修改两者，期间有并发修改时
+        读到的 used_space 必然已过期，按读到的值做条件 UPDATE 不会覆盖并发的 F() 更新，
+        未命中的用户重新计算
+        """
+        for _ in range(MAX_ATTEMPTS):
+            used = dict(User.objects.filter(pk__in=user_ids).values_list('id', 'used_space'))
+            totals = dict(
+                files.filter(user_id__in=user_ids)
+                .values('user_id')
+                .annotate(total=Sum('size'))
+                .order_by()
+                .values_list('user_id', 'total')
+            )
+
+            stale = []
+            with transaction.atomic():
+                for user_id, used_space in used.items():
+                    total = totals.get(user_id) or 0
+                    if total == used_space:
+                        continue
+                    if not User.objects.filter(pk=user_id, used_space=used_space).update(used_space=total):
+                        stale.append(user_id)
+            invalidate_user(*used)
+            if not stale:
+                return 0
+            user_ids = stale
+        return len(user_ids)
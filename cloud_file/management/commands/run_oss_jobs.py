@@ -0,0 +1,36 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from cloud_file.jobs import claim_jobs, make_worker_id, run_job
+
+
+class Command(BaseCommand):
+    help = '执行 OSS 后台任务队列（批量领取、线程池执行、失败退避重试）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='队列为空时的轮询间隔（秒）')
+        parser.add_argument('--once', action='store_true', help='处理完当前到期任务后退出')
+
+    def handle(self, *args, **options):
+        worker_id = make_worker_id()
+        self.stdout.write(f'OSS job worker {worker_id} started')
+
+        with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+            try:
+                while True:
+                    jobs = claim_jobs(worker_id, options['batch_size'])
+                    if jobs:
+                        results = list(executor.map(run_job, jobs))
+                        self.stdout.write(
+                            f'processed {len(results)} jobs, {results.count(False)} failed'
+                        )
+                        continue
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+            except KeyboardInterrupt:
+                self.stdout.write('OSS job worker stopped')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from cloud_file.upload_sessions import get_store
+
+
+class Command(BaseCommand):
+    help = '清理已过期的上传会话（UPLOAD_SESSION_BACKEND=db 时使用）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        store = get_store()
+        total = 0
+        while True:
+            count = store.sweep(options['batch_size'])
+            total += count
+            if count < options['batch_size']:
+                break
+        self.stdout.write(self.style.SUCCESS(f'swept {total} upload sessions'))
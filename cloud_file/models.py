@@ -1,22 +1,179 @@
 from django.db import models
+from django.utils import timezone
 from cloud_auth.models import User
 
+
+def normalize_folder_path(path):
+    """
+    统一目录路径格式：以 "/" 开头并以 "/" 结尾，根目录为 "/"
+    """
+    path = (path or '/').strip()
+    if not path.startswith('/'):
+        path = '/' + path
+    if not path.endswith('/'):
+        path = path + '/'
+    return path
+
+
+def subtree_range(prefix):
+    """
+    返回匹配以 prefix 开头的路径的 [lower, upper) 区间
+
+    使用区间比较而非 LIKE 'prefix%'，可以直接命中 (user, path) 索引
+    """
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class FileQuerySet(models.QuerySet):
+    def alive(self):
+        return self.filter(is_deleted=False)
+
+    def children_of(self, user, path='/'):
+        """
+        获取某个目录下的直接子项（命中 (user, path) 部分索引）
+        """
+        return self.filter(user=user, path=normalize_folder_path(path), is_deleted=False)
+
+    def descendants_of(self, folder):
+        """
+        获取某个文件夹下的全部子孙项（按物化路径做区间扫描）
+        """
+        lower, upper = subtree_range(folder.folder_path)
+        return self.filter(
+            user_id=folder.user_id,
+            path__gte=lower,
+            path__lt=upper,
+            is_deleted=False,
+        )
+
+    def subtree(self, file, is_deleted=False):
+        """
+        获取文件本身及其（作为文件夹时的）全部子孙项
+        """
+        query = models.Q(pk=file.pk)
+        if file.is_folder:
+            lower, upper = subtree_range(file.folder_path)
+            query |= models.Q(user_id=file.user_id, path__gte=lower, path__lt=upper)
+        return self.filter(query, is_deleted=is_deleted)
+
+    def folder_exists(self, user, path, name, exclude=None):
+        """
+        目录下是否已有同名文件夹
+
+        子项按物化路径归属文件夹，同一目录下的文件夹名称必须唯一，
+        否则同名文件夹的子树无法区分
+        """
+        folders = self.filter(user=user, path=normalize_folder_path(path), name=name, content_type='folder', is_deleted=False)
+        if exclude is not None:
+            folders = folders.exclude(pk=exclude.pk)
+        return folders.exists()
+
+    def folder_at(self, user, path):
+        """
+        根据目录路径查找对应的文件夹记录，根目录返回 None
+        """
+        path = normalize_folder_path(path)
+        if path == '/':
+            return None
+        parent_path, name = path[:-1].rsplit('/', 1)
+        return self.filter(
+            user=user,
+            path=parent_path + '/',
+            name=name,
+            content_type='folder',
+            is_deleted=False,
+        ).first()
+
+
+class StoredObject(models.Model):
+    """
+    按内容（SHA-256）去重的共享OSS对象，多个文件记录可引用同一对象
+
+    上传后的对象经后台任务校验哈希后 verified 才会被秒传引用，引用数归零时删除OSS对象
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    oss_url = models.URLField(max_length=1024)
+    size = models.BigIntegerField()
+    ref_count = models.IntegerField(default=0)
+    verified = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
 # Create your models here.
 class File(models.Model):
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    parent = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='children')
     name = models.CharField(max_length=255)
     content_type = models.CharField(max_length=255)
-    size = models.IntegerField()
-    oss_url = models.URLField(blank=True, null=True) 
+    size = models.BigIntegerField()
+    oss_url = models.URLField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     path = models.CharField(max_length=1024, blank=True, null=True, default='/')
     is_deleted = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+    # 引用的共享对象，为空时文件独占 oss_url 对应的对象
+    blob = models.ForeignKey(StoredObject, on_delete=models.SET_NULL, null=True, blank=True, related_name='files')
+
+    objects = FileQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # 目录列表：WHERE user_id = ? AND path = ? AND is_deleted = false
+            # 子树查询：WHERE user_id = ? AND path >= ? AND path < ?
+            models.Index(
+                fields=['user', 'path', 'name'],
+                condition=models.Q(is_deleted=False),
+                name='file_user_path_alive_idx',
+            ),
+            # 按创建时间排序的目录列表分页
+            models.Index(
+                fields=['user', 'path', 'created_at'],
+                condition=models.Q(is_deleted=False),
+                name='file_user_path_created_idx',
+            ),
+            # 按父目录遍历树：WHERE user_id = ? AND parent_id = ? AND is_deleted = false
+            models.Index(
+                fields=['user', 'parent'],
+                condition=models.Q(is_deleted=False),
+                name='file_user_parent_alive_idx',
+            ),
+            # purge_deleted：WHERE is_deleted = true AND deleted_at < cutoff
+            models.Index(
+                fields=['deleted_at'],
+                condition=models.Q(is_deleted=True),
+                name='file_deleted_at_idx',
+            ),
+        ]
+
+    @property
+    def is_folder(self):
+        return self.content_type == 'folder'
+
+    @property
+    def folder_path(self):
+        """
+        文件夹自身对应的目录路径，即其子项的 path
+        """
+        return f"{normalize_folder_path(self.path)}{self.name}/"
 
 class ExpireDaysChoice(models.IntegerChoices):
     ONE_DAY = 1, '1 Day'
     THREE_DAYS = 3, '3 Days'
     SEVEN_DAYS = 7, '7 Days'
     FIFTEEN_DAYS = 15, '15 Days'
+
+
+class DropQuerySet(models.QuerySet):
+    def with_expiry(self, now=None):
+        """
+        在查询时计算过期状态：已标记过期或已超过过期时间
+        """
+        return self.annotate(expired=models.ExpressionWrapper(
+            models.Q(is_expired=True) | models.Q(expire_time__lt=now or timezone.now()),
+            output_field=models.BooleanField(),
+        ))
+
+
 class Drop(models.Model):
     files = models.ManyToManyField(File)
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
@@ -30,4 +187,91 @@ class Drop(models.Model):
     max_download_count = models.IntegerField(default=1)
     password = models.CharField(max_length=255, blank=True, null=True)
     is_deleted = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    objects = DropQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # 有效分享的分享码唯一，同时作为按分享码查询的索引
+            models.UniqueConstraint(
+                fields=['code'],
+                condition=models.Q(is_deleted=False),
+                name='drop_unique_active_code',
+            ),
+        ]
+        indexes = [
+            # expire_drops：WHERE is_expired = false AND expire_time < now
+            models.Index(
+                fields=['expire_time'],
+                condition=models.Q(is_expired=False),
+                name='drop_unexpired_time_idx',
+            ),
+            # 我的分享列表：WHERE user_id = ? AND is_deleted = false
+            models.Index(
+                fields=['user', 'created_at'],
+                condition=models.Q(is_deleted=False),
+                name='drop_user_alive_idx',
+            ),
+            # purge_deleted：WHERE is_deleted = true AND deleted_at < cutoff
+            models.Index(
+                fields=['deleted_at'],
+                condition=models.Q(is_deleted=True),
+                name='drop_deleted_at_idx',
+            ),
+        ]
+
+    @property
+    def has_expired(self):
+        expired = getattr(self, 'expired', None)
+        if expired is not None:
+            return expired
+        return self.is_expired or self.expire_time < timezone.now()
+
+
+class QuotaReservation(models.Model):
+    """
+    上传凭证签发时预留的配额，上传完成后转为已用空间，过期后由 expire_reservations 释放
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    upload_id = models.CharField(max_length=64, unique=True)
+    size = models.BigIntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class UploadSession(models.Model):
+    """
+    上传凭证签发后、申报完成前的上传会话（UPLOAD_SESSION_BACKEND=db 时使用）
+    """
+    upload_id = models.CharField(max_length=64, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    data = models.JSONField(default=dict)
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class OSSJob(models.Model):
+    """
+    OSS 副作用的持久化任务（发件箱），由 run_oss_jobs 命令异步执行
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        FAILED = 'failed', 'Failed'
+
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.IntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=64, blank=True, default='')
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # 领取任务：WHERE status = 'pending' AND run_after <= now ORDER BY run_after
+            models.Index(fields=['status', 'run_after'], name='ossjob_status_run_after_idx'),
+        ]
@@ -1,4 +1,5 @@
 import json
+from collections import OrderedDict
 import base64
 import hmac
 import hashlib
@@ -6,7 +7,132 @@ from datetime import datetime, timedelta
 from urllib.parse import quote
 from django.conf import settings
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import re
+import threading
+import time
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+
+# DeleteMultipleObjects 单次请求最多删除的对象数
+OSS_DELETE_BATCH_SIZE = 1000
+# 分片上传的分片数上限与最小分片大小（最后一个分片除外）
+OSS_MAX_PARTS = 10000
+OSS_MIN_PART_SIZE = 100 * 1024
+# CopyObject 支持的最大对象，更大的对象使用分片复制
+OSS_COPY_OBJECT_MAX = 1024 * 1024 * 1024
+OSS_COPY_PART_SIZE = 512 * 1024 * 1024
+# 去重共享对象的存放前缀，只有服务端可以写入（上传凭证只允许写入 "{username}/"）
+SHARED_OBJECT_PREFIX = 'blobs/'
+
+
+def oss_key_from_url(oss_url):
+    """
+    从完整的OSS URL中提取对象路径，空URL（如文件夹）返回空字符串
+    """
+    from urllib.parse import urlparse
+    return urlparse(oss_url or '').path.lstrip('/')
+
+
+class OSSStats:
+    """按操作统计 OSS 请求次数、失败次数与耗时（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ops = {}
+
+    def record(self, operation, elapsed, ok=True):
+        with self._lock:
+            op = self._ops.setdefault(operation, {
+                'count': 0,
+                'errors': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+            })
+            elapsed_ms = elapsed * 1000
+            op['count'] += 1
+            op['total_ms'] += elapsed_ms
+            op['max_ms'] = max(op['max_ms'], elapsed_ms)
+            if not ok:
+                op['errors'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: dict(op, avg_ms=round(op['total_ms'] / op['count'], 3) if op['count'] else 0.0)
+                for name, op in self._ops.items()
+            }
+
+
+class SignedURLCache:
+    """
+    有界 LRU 缓存，保存已签名的下载URL（线程安全）
+
+    键中包含对齐后的过期时间，窗口切换后旧条目不会再被命中，随 LRU 淘汰
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def info(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+            }
+
+
+def build_session(pool_size, max_retries, backoff_factor):
+    """
+    创建带连接池与重试策略的 requests.Session
+
+    连接保持长连接复用，避免每次调用都重新进行 TLS 握手；
+    5xx 与超时按指数退避重试有限次数
+    """
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset(['HEAD', 'GET', 'PUT', 'DELETE', 'POST']),
+        raise_on_status=False,
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
 
 class OSSTokenGenerator:
     """阿里云 OSS 上传Token生成器"""
@@ -16,6 +142,38 @@ class OSSTokenGenerator:
         self.access_key_secret = settings.ALIYUN_ACCESS_KEY_SECRET
         self.bucket_name = settings.OSS_BUCKET_NAME
         self.endpoint = settings.OSS_ENDPOINT
+        self.timeout = settings.OSS_TIMEOUT
+        self.session = build_session(
+            settings.OSS_POOL_SIZE,
+            settings.OSS_MAX_RETRIES,
+            settings.OSS_RETRY_BACKOFF,
+        )
+        self.stats = OSSStats()
+        self.url_cache = SignedURLCache(settings.OSS_URL_CACHE_SIZE)
+        self.url_expiry_window = settings.OSS_URL_EXPIRY_WINDOW
+
+    def _sign(self, string_to_sign):
+        return base64.b64encode(
+            hmac.new(
+                self.access_key_secret.encode('utf-8'),
+                string_to_sign.encode('utf-8'),
+                hashlib.sha1
+            ).digest()
+        ).decode('utf-8')
+
+    def _request(self, operation, method, url, **kwargs):
+        """
+        通过共享连接池发送请求，并记录耗时
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        start = time.monotonic()
+        ok = False
+        try:
+            response = self.session.request(method, url, **kwargs)
+            ok = response.status_code < 500
+            return response
+        finally:
+            self.stats.record(operation, time.monotonic() - start, ok)
     
     def generate_upload_token(self, username, file_size, duration_seconds=3600):
         """
@@ -34,8 +192,10 @@ class OSSTokenGenerator:
             expiration = datetime.now() + timedelta(seconds=duration_seconds)
             expiration_iso = expiration.strftime('%Y-%m-%dT%H:%M:%S.000Z')
             
-            # 文件路径前缀
+            # 文件路径前缀，不能与服务端专用的共享对象前缀重叠
             prefix = f"{username}/"
+            if prefix.startswith(SHARED_OBJECT_PREFIX):
+                raise ValueError(f"Username '{username}' is reserved")
             
             # 动态计算文件大小限制（允许10%的缓冲区，最小1MB缓冲）
             size_buffer = max(1024 * 1024, int(file_size * 0.1))  # 最小1MB或10%缓冲
@@ -57,13 +217,7 @@ class OSSTokenGenerator:
             ).decode('utf-8')
             
             # 计算签名
-            signature = base64.b64encode(
-                hmac.new(
-                    self.access_key_secret.encode('utf-8'),
-                    policy_base64.encode('utf-8'),
-                    hashlib.sha1
-                ).digest()
-            ).decode('utf-8')
+            signature = self._sign(policy_base64)
             
             return {
                 'access_key_id': self.access_key_id,
@@ -93,13 +247,23 @@ class OSSTokenGenerator:
             str: 带签名的下载URL
         """
         try:
+            # 过期时间对齐到固定窗口，同一窗口内重复请求得到完全相同的URL，
+            # 既可直接命中缓存，也便于浏览器/CDN缓存；窗口 <= 0 时不对齐
+            window = self.url_expiry_window
+            expiration = int(time.time()) + expires_in
+            if window > 0:
+                expiration = -(-expiration // window) * window
+
+            cache_key = (object_key, expiration)
+            download_url = self.url_cache.get(cache_key)
+            if download_url is not None:
+                return download_url
+
             # 从完整URL中提取文件路径
             from urllib.parse import urlparse
             parsed_url = urlparse(object_key)
             file_path = parsed_url.path.lstrip('/')
             
-            expiration = int((datetime.now() + timedelta(seconds=expires_in)).timestamp())
-            
             # 构造StringToSign（用于URL签名）
             # StringToSign = VERB + "\n" + CONTENT-MD5 + "\n" + CONTENT-TYPE + "\n" + EXPIRES + "\n" + CanonicalizedOSSHeaders + CanonicalizedResource
             verb = "GET"
@@ -112,13 +276,7 @@ class OSSTokenGenerator:
             string_to_sign = f"{verb}\n{content_md5}\n{content_type}\n{expires}\n{canonicalized_oss_headers}{canonicalized_resource}"
             
             # 计算签名
-            signature = base64.b64encode(
-                hmac.new(
-                    self.access_key_secret.encode('utf-8'),
-                    string_to_sign.encode('utf-8'),
-                    hashlib.sha1
-                ).digest()
-            ).decode('utf-8')
+            signature = self._sign(string_to_sign)
             
             # URL编码签名（重要：URL中的签名需要进行URL编码）
             signature_encoded = quote(signature, safe='')
@@ -129,7 +287,8 @@ class OSSTokenGenerator:
                 f"https://{self.bucket_name}.{host}/"
                 f"{file_path}?OSSAccessKeyId={self.access_key_id}&Expires={expiration}&Signature={signature_encoded}"
             )
-            
+
+            self.url_cache.set(cache_key, download_url)
             return download_url
             
         except Exception as e:
@@ -239,13 +398,7 @@ class OSSTokenGenerator:
             string_to_sign = f"{verb}\n{content_md5}\n{content_type}\n{expires}\n{canonicalized_oss_headers}{canonicalized_resource}"
             
             # 计算签名
-            signature = base64.b64encode(
-                hmac.new(
-                    self.access_key_secret.encode('utf-8'),
-                    string_to_sign.encode('utf-8'),
-                    hashlib.sha1
-                ).digest()
-            ).decode('utf-8')
+            signature = self._sign(string_to_sign)
             
             # 构建请求参数
             params = {
@@ -254,7 +407,7 @@ class OSSTokenGenerator:
                 'Signature': signature
             }
             
-            response = requests.delete(url, params=params, timeout=10)
+            response = self._request('delete', 'DELETE', url, params=params)
             
             if response.status_code in [204, 404]:  # 204表示删除成功，404表示文件不存在（也算删除成功）
                 return True
@@ -262,4 +415,256 @@ class OSSTokenGenerator:
                 raise Exception(f"OSS delete failed with status {response.status_code}: {response.text}")
                 
         except Exception as e:
-            raise Exception(f"Error deleting file from OSS: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Error deleting file from OSS: {str(e)}")
+
+    def delete_files(self, object_keys):
+        """
+        使用 DeleteMultipleObjects 批量删除OSS文件，每批最多 1000 个
+
+        Args:
+            object_keys: 文件在OSS中的路径列表（不包含bucket名）
+
+        Returns:
+            int: 提交删除的文件数量
+        """
+        object_keys = [key for key in object_keys if key]
+        for start in range(0, len(object_keys), OSS_DELETE_BATCH_SIZE):
+            self._delete_batch(object_keys[start:start + OSS_DELETE_BATCH_SIZE])
+        return len(object_keys)
+
+    def _delete_batch(self, object_keys):
+        try:
+            host = self.endpoint.replace('https://', '').replace('http://', '')
+            url = f"https://{self.bucket_name}.{host}/?delete"
+
+            # Quiet 模式下 OSS 只返回删除失败的对象
+            body = (
+                '<?xml version="1.0" encoding="UTF-8"?><Delete><Quiet>true</Quiet>'
+                + ''.join(f'<Object><Key>{escape(key)}</Key></Object>' for key in object_keys)
+                + '</Delete>'
+            ).encode('utf-8')
+
+            expiration = int((datetime.now() + timedelta(seconds=60)).timestamp())
+
+            verb = "POST"
+            content_md5 = base64.b64encode(hashlib.md5(body).digest()).decode('utf-8')
+            content_type = "application/xml"
+            expires = str(expiration)
+            canonicalized_oss_headers = ""
+            canonicalized_resource = f"/{self.bucket_name}/?delete"
+
+            string_to_sign = f"{verb}\n{content_md5}\n{content_type}\n{expires}\n{canonicalized_oss_headers}{canonicalized_resource}"
+
+            signature = self._sign(string_to_sign)
+
+            params = {
+                'OSSAccessKeyId': self.access_key_id,
+                'Expires': expires,
+                'Signature': signature
+            }
+            headers = {
+                'Content-MD5': content_md5,
+                'Content-Type': content_type,
+            }
+
+            response = self._request('delete_multiple', 'POST', url, params=params, data=body, headers=headers)
+
+            if response.status_code != 200:
+                raise Exception(f"OSS batch delete failed with status {response.status_code}: {response.text}")
+
+            failed = re.findall(r"<Key>(.*?)</Key>", response.text)
+            if failed:
+                raise Exception(f"OSS batch delete failed for {len(failed)} objects")
+
+        except Exception as e:
+            raise Exception(f"Error deleting files from OSS: {str(e)}")
+
+    def _object_url(self, object_key, subresource=''):
+        host = self.endpoint.replace('https://', '').replace('http://', '')
+        return f"https://{self.bucket_name}.{host}/{quote(object_key)}{subresource}"
+
+    def object_url(self, object_key):
+        """
+        对象的完整URL（与客户端上传后申报的 oss_url 格式一致）
+        """
+        return self._object_url(object_key)
+
+    def _signed_params(self, verb, canonicalized_resource, content_md5='', content_type='', expires_in=60, oss_headers=None):
+        """
+        生成 URL 签名参数（OSSAccessKeyId / Expires / Signature）
+
+        canonicalized_resource 中的对象路径不做 URL 编码，子资源按字典序排列；
+        oss_headers 为请求携带的 x-oss-* 头，按小写名称排序后参与签名
+        """
+        expires = str(int(time.time()) + expires_in)
+        canonicalized_oss_headers = ''.join(
+            f"{name.lower()}:{value}\n" for name, value in sorted((oss_headers or {}).items())
+        )
+        string_to_sign = f"{verb}\n{content_md5}\n{content_type}\n{expires}\n{canonicalized_oss_headers}{canonicalized_resource}"
+        return {
+            'OSSAccessKeyId': self.access_key_id,
+            'Expires': expires,
+            'Signature': self._sign(string_to_sign),
+        }
+
+    def get_object(self, object_key, headers=None):
+        """
+        以流式方式读取OSS对象，调用方负责关闭返回的响应
+
+        Args:
+            headers: 额外请求头（如 Range）
+        """
+        params = self._signed_params('GET', f"/{self.bucket_name}/{object_key}")
+        return self._request('get', 'GET', self._object_url(object_key), params=params, headers=headers, stream=True)
+
+    def copy_object(self, source_key, target_key, size):
+        """
+        在OSS服务端复制对象：1 GB 以内使用 CopyObject，更大的对象按分片复制（UploadPartCopy）
+
+        Returns:
+            bool: 源对象不存在时返回 False
+        """
+        copy_source = f"/{self.bucket_name}/{quote(source_key)}"
+        if size <= OSS_COPY_OBJECT_MAX:
+            headers = {'x-oss-copy-source': copy_source}
+            params = self._signed_params('PUT', f"/{self.bucket_name}/{target_key}", oss_headers=headers)
+            response = self._request('copy', 'PUT', self._object_url(target_key), params=params, headers=headers)
+            if response.status_code == 404:
+                return False
+            if response.status_code != 200:
+                raise Exception(f"OSS copy object failed with status {response.status_code}: {response.text}")
+            return True
+
+        oss_upload_id = self.initiate_multipart_upload(target_key)
+        try:
+            parts = []
+            for part_number, start in enumerate(range(0, size, OSS_COPY_PART_SIZE), 1):
+                end = min(start + OSS_COPY_PART_SIZE, size) - 1
+                headers = {'x-oss-copy-source': copy_source, 'x-oss-copy-source-range': f"bytes={start}-{end}"}
+                params = self._signed_params(
+                    'PUT', f"/{self.bucket_name}/{target_key}?partNumber={part_number}&uploadId={oss_upload_id}",
+                    oss_headers=headers,
+                )
+                params.update({'partNumber': part_number, 'uploadId': oss_upload_id})
+                response = self._request('copy_part', 'PUT', self._object_url(target_key), params=params, headers=headers)
+                if response.status_code == 404:
+                    self.abort_multipart_upload(target_key, oss_upload_id)
+                    return False
+                if response.status_code != 200:
+                    raise Exception(f"OSS copy part failed with status {response.status_code}: {response.text}")
+                parts.append({
+                    'part_number': part_number,
+                    'etag': ElementTree.fromstring(response.content).findtext('ETag'),
+                })
+            self.complete_multipart_upload(target_key, oss_upload_id, parts)
+        except Exception:
+            self.abort_multipart_upload(target_key, oss_upload_id)
+            raise
+        return True
+
+    def initiate_multipart_upload(self, object_key):
+        """
+        初始化分片上传
+
+        Returns:
+            str: OSS 分配的 UploadId
+        """
+        params = self._signed_params('POST', f"/{self.bucket_name}/{object_key}?uploads")
+        response = self._request('multipart_initiate', 'POST', self._object_url(object_key, '?uploads'), params=params)
+        if response.status_code != 200:
+            raise Exception(f"OSS initiate multipart upload failed with status {response.status_code}: {response.text}")
+        return ElementTree.fromstring(response.content).findtext('UploadId')
+
+    def generate_part_upload_url(self, object_key, oss_upload_id, part_number, expires_in=3600):
+        """
+        生成客户端直接 PUT 分片的签名URL（请求不能携带 Content-Type）
+        """
+        resource = f"/{self.bucket_name}/{object_key}?partNumber={part_number}&uploadId={oss_upload_id}"
+        params = self._signed_params('PUT', resource, expires_in=expires_in)
+        return (
+            f"{self._object_url(object_key)}?partNumber={part_number}&uploadId={quote(oss_upload_id, safe='')}"
+            f"&OSSAccessKeyId={params['OSSAccessKeyId']}&Expires={params['Expires']}"
+            f"&Signature={quote(params['Signature'], safe='')}"
+        )
+
+    def list_parts(self, object_key, oss_upload_id):
+        """
+        列出已上传的分片
+
+        Returns:
+            list: [{'part_number': int, 'etag': str, 'size': int}]，按分片号排序
+        """
+        parts = []
+        marker = 0
+        while True:
+            params = self._signed_params('GET', f"/{self.bucket_name}/{object_key}?uploadId={oss_upload_id}")
+            params.update({'uploadId': oss_upload_id, 'max-parts': 1000, 'part-number-marker': marker})
+            response = self._request('multipart_list', 'GET', self._object_url(object_key), params=params)
+            if response.status_code != 200:
+                raise Exception(f"OSS list parts failed with status {response.status_code}: {response.text}")
+
+            root = ElementTree.fromstring(response.content)
+            for part in root.iter('Part'):
+                parts.append({
+                    'part_number': int(part.findtext('PartNumber')),
+                    'etag': part.findtext('ETag'),
+                    'size': int(part.findtext('Size')),
+                })
+            if root.findtext('IsTruncated') != 'true':
+                return parts
+            marker = int(root.findtext('NextPartNumberMarker'))
+
+    def complete_multipart_upload(self, object_key, oss_upload_id, parts):
+        """
+        按分片列表合并为完整对象
+
+        Args:
+            parts: list_parts 返回的分片列表
+        """
+        body = (
+            '<?xml version="1.0" encoding="UTF-8"?><CompleteMultipartUpload>'
+            + ''.join(
+                f"<Part><PartNumber>{part['part_number']}</PartNumber><ETag>{escape(part['etag'])}</ETag></Part>"
+                for part in parts
+            )
+            + '</CompleteMultipartUpload>'
+        ).encode('utf-8')
+        content_md5 = base64.b64encode(hashlib.md5(body).digest()).decode('utf-8')
+        content_type = 'application/xml'
+
+        params = self._signed_params(
+            'POST', f"/{self.bucket_name}/{object_key}?uploadId={oss_upload_id}", content_md5, content_type,
+        )
+        params['uploadId'] = oss_upload_id
+        headers = {'Content-MD5': content_md5, 'Content-Type': content_type}
+        response = self._request(
+            'multipart_complete', 'POST', self._object_url(object_key), params=params, data=body, headers=headers,
+        )
+        if response.status_code != 200:
+            raise Exception(f"OSS complete multipart upload failed with status {response.status_code}: {response.text}")
+
+    def abort_multipart_upload(self, object_key, oss_upload_id):
+        """
+        取消分片上传并删除已上传的分片，上传不存在时视为成功
+        """
+        params = self._signed_params('DELETE', f"/{self.bucket_name}/{object_key}?uploadId={oss_upload_id}")
+        params['uploadId'] = oss_upload_id
+        response = self._request('multipart_abort', 'DELETE', self._object_url(object_key), params=params)
+        if response.status_code not in [204, 404]:
+            raise Exception(f"OSS abort multipart upload failed with status {response.status_code}: {response.text}")
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_oss_client():
+    """
+    获取进程内共享的 OSS 客户端，所有视图复用同一个连接池
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OSSTokenGenerator()
+    return _client
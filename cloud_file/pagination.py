@@ -0,0 +1,123 @@
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# 允许的排序字段，与 id 组成唯一的键集顺序
+SORT_FIELDS = ('name', 'created_at')
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def parse_sort(sort):
+    """
+    解析排序参数，如 "name" / "-created_at"，返回 (字段, 是否倒序)
+    """
+    sort = sort or 'name'
+    descending = sort.startswith('-')
+    field = sort.lstrip('-')
+    if field not in SORT_FIELDS:
+        raise InvalidCursor(f"sort must be one of: {', '.join(SORT_FIELDS)}")
+    return field, descending
+
+
+def parse_page_size(page_size):
+    if page_size in (None, ''):
+        return DEFAULT_PAGE_SIZE
+    try:
+        page_size = int(page_size)
+    except (TypeError, ValueError):
+        raise InvalidCursor('page_size must be a valid integer')
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def encode_cursor(field, descending, value, pk):
+    if field == 'created_at':
+        value = value.isoformat()
+    payload = json.dumps({'f': field, 'd': descending, 'v': value, 'id': pk}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor, field, descending):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        value, pk = payload['v'], int(payload['id'])
+        if payload['f'] != field or payload['d'] != descending:
+            raise ValueError('cursor does not match sort')
+        if field == 'created_at':
+            value = parse_datetime(value)
+            if value is None:
+                raise ValueError('bad datetime')
+    except (TypeError, ValueError, KeyError, UnicodeError, json.JSONDecodeError) as e:
+        raise InvalidCursor(f'Invalid cursor: {str(e)}')
+    return value, pk
+
+
+def order_keyset(queryset, field, descending):
+    prefix = '-' if descending else ''
+    return queryset.order_by(f'{prefix}{field}', f'{prefix}id')
+
+
+def after_cursor(queryset, field, descending, cursor):
+    """
+    只保留位于游标之后的记录：(field, id) > (value, pk)
+    """
+    value, pk = decode_cursor(cursor, field, descending)
+    op = 'lt' if descending else 'gt'
+    return queryset.filter(
+        Q(**{f'{field}__{op}': value}) | Q(**{field: value, f'id__{op}': pk})
+    )
+
+
+def keyset_query(queryset, sort=None, cursor=None, page_size=None):
+    """
+    构造键集分页查询（多取一条用于判断是否有下一页），返回 (查询集, 排序字段, 是否降序, 每页条数)
+    """
+    field, descending = parse_sort(sort)
+    page_size = parse_page_size(page_size)
+
+    queryset = order_keyset(queryset, field, descending)
+    if cursor:
+        queryset = after_cursor(queryset, field, descending, cursor)
+    return queryset[:page_size + 1], field, descending, page_size
+
+
+def keyset_result(rows, field, descending, page_size):
+    """
+    截取当前页记录并生成下一页游标
+    """
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        if isinstance(last, dict):
+            value, pk = last[field], last['id']
+        else:
+            value, pk = getattr(last, field), last.id
+        next_cursor = encode_cursor(field, descending, value, pk)
+    return rows, next_cursor
+
+
+def keyset_page(queryset, sort=None, cursor=None, page_size=None):
+    """
+    键集分页：按 (sort, id) 排序，返回 (当前页记录, 下一页游标)
+
+    不使用 OFFSET，翻页代价与所在页数无关
+    """
+    queryset, field, descending, page_size = keyset_query(queryset, sort, cursor, page_size)
+    return keyset_result(list(queryset), field, descending, page_size)
+
+
+async def akeyset_page(queryset, sort=None, cursor=None, page_size=None):
+    """
+    keyset_page 的异步版本，使用异步 ORM 读取当前页
+    """
+    queryset, field, descending, page_size = keyset_query(queryset, sort, cursor, page_size)
+    return keyset_result([row async for row in queryset], field, descending, page_size)
@@ -0,0 +1,139 @@
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from .oss_utils import get_oss_client, oss_key_from_url
+from .streaming import streaming_response
+
+
+# 透传给客户端的 OSS 响应头（按原始字节转发，Content-Encoding 一并透传）
+PASSTHROUGH_HEADERS = ('Content-Length', 'Content-Range', 'Content-Encoding', 'ETag', 'Last-Modified')
+
+
+def slot_key(client_id):
+    return f"proxy_downloads_{client_id}"
+
+
+def acquire_slot(client_id):
+    """
+    占用一个代理下载并发名额，超过 PROXY_DOWNLOAD_CONCURRENCY 时返回 False
+
+    计数保存在缓存中，多进程部署时需要配置共享缓存（如 Redis）；
+    计数键带有效期，进程异常退出未释放的名额会在过期后自动恢复
+    """
+    key = slot_key(client_id)
+    cache.add(key, 0, timeout=settings.PROXY_DOWNLOAD_SLOT_TIMEOUT)
+    if cache.incr(key) > settings.PROXY_DOWNLOAD_CONCURRENCY:
+        release_slot(client_id)
+        return False
+    return True
+
+
+def release_slot(client_id):
+    try:
+        cache.decr(slot_key(client_id))
+    except ValueError:
+        # 计数键已过期
+        pass
+
+
+class ProxyStream:
+    """
+    按固定大小分块转发 OSS 响应体
+
+    由服务器逐块拉取：上一块写入客户端后才会读取下一块，客户端读取慢时
+    OSS 连接随之阻塞，进程内只保留一个分块。响应结束或客户端断开时
+    Django 调用 close()，关闭 OSS 连接并释放并发名额
+
+    转发原始字节不做解码：对象带 Content-Encoding（如 gzip）时，透传的
+    Content-Length / Content-Range 对应的是编码后的字节
+    """
+
+    def __init__(self, response, client_id, chunk_size):
+        self.response = response
+        self.client_id = client_id
+        self.chunk_size = chunk_size
+        self.closed = False
+
+    def __iter__(self):
+        return self.response.raw.stream(self.chunk_size, decode_content=False)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.response.close()
+        release_slot(self.client_id)
+
+
+def if_range_matches(if_range, response):
+    """
+    If-Range 与对象当前的 ETag（强校验）或 Last-Modified 一致时返回 True
+    """
+    if if_range.startswith('W/'):
+        return False
+    return if_range in (response.headers.get('ETag'), response.headers.get('Last-Modified'))
+
+
+def open_object(oss_key, range_header, if_range):
+    """
+    读取OSS对象，range_header 不为空时只读取对应区间
+
+    OSS 不支持 If-Range，这里在拿到响应后比对校验值：对象已变化时丢弃分段响应并重新读取整个对象
+    """
+    client = get_oss_client()
+    headers = {'Range': range_header} if range_header else None
+    response = client.get_object(oss_key, headers=headers)
+    if response.status_code == 206 and if_range and not if_range_matches(if_range, response):
+        response.close()
+        response = client.get_object(oss_key)
+    return response
+
+
+def proxy_response(request, client_id, file, inline=False):
+    """
+    通过后端转发下载OSS对象，支持 Range / If-Range（用于视频拖动与断点续传）
+
+    Args:
+        client_id: 并发限制的计数维度（用户ID或客户端IP）
+        file: 包含 name、content_type、oss_url 的文件行
+        inline: 以 inline 方式返回（浏览器直接播放），否则为附件下载
+    """
+    if not acquire_slot(client_id):
+        return HttpResponse('Too many concurrent downloads', status=429, content_type='text/plain')
+
+    try:
+        range_header = request.headers.get('Range', '')
+        if not range_header.startswith('bytes='):
+            range_header = ''
+        response = open_object(oss_key_from_url(file['oss_url']), range_header, request.headers.get('If-Range'))
+    except Exception:
+        release_slot(client_id)
+        raise
+
+    if response.status_code not in (200, 206):
+        response.close()
+        release_slot(client_id)
+        if response.status_code == 416:
+            result = HttpResponse(status=416)
+            result['Content-Range'] = response.headers.get('Content-Range', '')
+            return result
+        if response.status_code == 404:
+            return HttpResponse('Object not found', status=404, content_type='text/plain')
+        return HttpResponse('OSS request failed', status=502, content_type='text/plain')
+
+    result = streaming_response(
+        request,
+        ProxyStream(response, client_id, settings.PROXY_CHUNK_SIZE),
+        status=response.status_code,
+        content_type=file['content_type'] or 'application/octet-stream',
+    )
+    for header in PASSTHROUGH_HEADERS:
+        if header in response.headers:
+            result[header] = response.headers[header]
+    result['Accept-Ranges'] = 'bytes'
+    disposition = 'inline' if inline else 'attachment'
+    result['Content-Disposition'] = f"{disposition}; filename*=UTF-8''{quote(file['name'])}"
+    return result
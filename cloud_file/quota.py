@@ -0,0 +1,137 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from cloud_auth.authentication import invalidate_user
+from cloud_auth.models import User
+from .models import QuotaReservation
+
+
+# 与上传会话的有效期保持一致
+RESERVATION_TIMEOUT = timedelta(hours=1)
+
+
+def check_sizes(uploads):
+    """
+    预留/转换的字节数必须为正数，负数会抵扣已用空间
+    """
+    if any(not isinstance(size, int) or size <= 0 for size in uploads.values()):
+        raise ValueError('Upload sizes must be positive integers')
+
+
+def reserve(user_id, uploads, timeout=RESERVATION_TIMEOUT):
+    """
+    为一组上传预留配额
+
+    Args:
+        user_id: 用户ID
+        uploads: {upload_id: 预留字节数}
+
+    Returns:
+        bool: 剩余配额不足时返回 False，不做任何预留
+    """
+    check_sizes(uploads)
+    total = sum(uploads.values())
+    expires_at = timezone.now() + timeout
+    with transaction.atomic():
+        # 条件更新：used_space + reserved_space + total <= quota
+        updated = User.objects.filter(
+            pk=user_id,
+            quota__gte=F('used_space') + F('reserved_space') + total,
+        ).update(reserved_space=F('reserved_space') + total)
+        if not updated:
+            return False
+        invalidate_user(user_id)
+        QuotaReservation.objects.bulk_create([
+            QuotaReservation(user_id=user_id, upload_id=upload_id, size=size, expires_at=expires_at)
+            for upload_id, size in uploads.items()
+        ])
+    return True
+
+
+def commit(user_id, uploads):
+    """
+    上传完成后将预留转换为已用空间
+
+    预留已过期（已被释放）的上传按当前剩余配额直接扣减
+
+    Args:
+        user_id: 用户ID
+        uploads: {upload_id: 实际占用字节数}
+
+    Returns:
+        bool: 配额不足时返回 False，不转换已用空间并释放对应的预留
+    """
+    check_sizes(uploads)
+    total = sum(uploads.values())
+    with transaction.atomic():
+        reservations = QuotaReservation.objects.filter(user_id=user_id, upload_id__in=list(uploads))
+        reserved = dict(reservations.values_list('upload_id', 'size'))
+        reserved_total = sum(reserved.values())
+
+        if reserved and reservations.filter(upload_id__in=list(reserved)).delete()[0] != len(reserved):
+            raise Exception('Upload session committed concurrently')
+
+        # 条件更新：used_space + total + (reserved_space - reserved_total) <= quota
+        updated = User.objects.filter(
+            pk=user_id,
+            quota__gte=F('used_space') + F('reserved_space') - reserved_total + total,
+        ).update(
+            used_space=F('used_space') + total,
+            reserved_space=Greatest(F('reserved_space') - reserved_total, 0),
+        )
+        if updated:
+            invalidate_user(user_id)
+        else:
+            transaction.set_rollback(True)
+
+    if not updated:
+        # 上传的对象会被删除，预留不再需要，立即释放而不是等到过期
+        release(user_id, list(uploads))
+        return False
+    return True
+
+
+def release(user_id, upload_ids):
+    """
+    取消一组上传的预留
+    """
+    with transaction.atomic():
+        reservations = QuotaReservation.objects.filter(user_id=user_id, upload_id__in=list(upload_ids))
+        reserved = dict(reservations.values_list('upload_id', 'size'))
+        if not reserved:
+            return 0
+        if reservations.filter(upload_id__in=list(reserved)).delete()[0] != len(reserved):
+            raise Exception('Upload session committed concurrently')
+        released = sum(reserved.values())
+        User.objects.filter(pk=user_id).update(reserved_space=Greatest(F('reserved_space') - released, 0))
+        invalidate_user(user_id)
+    return released
+
+
+def release_expired(batch_size=1000, now=None):
+    """
+    释放一批过期的预留，返回释放的条数
+
+    逐条按主键删除，只有真正删除成功的预留才会扣减 reserved_space，
+    与并发的 commit 不会重复扣减
+    """
+    now = now or timezone.now()
+    expired = list(
+        QuotaReservation.objects.filter(expires_at__lt=now)
+        .order_by('expires_at')
+        .values_list('id', 'user_id', 'size')[:batch_size]
+    )
+
+    released = {}
+    with transaction.atomic():
+        for reservation_id, user_id, size in expired:
+            if QuotaReservation.objects.filter(pk=reservation_id).delete()[0]:
+                released[user_id] = released.get(user_id, 0) + size
+        for user_id, size in released.items():
+            User.objects.filter(pk=user_id).update(reserved_space=Greatest(F('reserved_space') - size, 0))
+        invalidate_user(*released)
+    return len(expired)
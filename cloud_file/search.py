@@ -0,0 +1,136 @@
+from django.db import connection, connections
+from django.db.models.expressions import RawSQL
+from django.utils.dateparse import parse_datetime
+
+from .models import File, normalize_folder_path, subtree_range
+
+
+FTS_TABLE = 'cloud_file_file_fts'
+
+# SQLite：以文件表为外部内容表的 FTS5 trigram 索引，由触发器与文件表保持同步
+FTS_SCHEMA = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, content='cloud_file_file', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS cloud_file_file_fts_ai AFTER INSERT ON cloud_file_file BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS cloud_file_file_fts_ad AFTER DELETE ON cloud_file_file BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) VALUES ('delete', old.id, old.name);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS cloud_file_file_fts_au AFTER UPDATE OF name ON cloud_file_file BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name);
+    END
+    """,
+]
+
+# trigram 分词只能匹配不少于 3 个字符的子串
+MIN_FTS_QUERY_LENGTH = 3
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def ensure_fts_index(sender=None, using='default', **kwargs):
+    """
+    post_migrate 信号处理：在 SQLite 上创建搜索索引与同步触发器，首次创建时从文件表重建索引
+    """
+    conn = connections[using]
+    if conn.vendor != 'sqlite':
+        return
+    with conn.cursor() as cursor:
+        tables = conn.introspection.table_names(cursor)
+        if FTS_TABLE in tables or File._meta.db_table not in tables:
+            return
+        for statement in FTS_SCHEMA:
+            cursor.execute(statement)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def match_name(queryset, query, prefix=False):
+    """
+    按文件名匹配：默认子串匹配，prefix=True 时前缀匹配
+
+    SQLite 上不少于 3 个字符的查询走 FTS5 trigram 索引，其余情况退化为 LIKE
+    """
+    if fts_available() and len(query) >= MIN_FTS_QUERY_LENGTH:
+        phrase = '"' + query.replace('"', '""') + '"'
+        queryset = queryset.filter(id__in=RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [phrase],
+        ))
+    elif not prefix:
+        queryset = queryset.filter(name__icontains=query)
+    if prefix:
+        queryset = queryset.filter(name__istartswith=query)
+    return queryset
+
+
+def parse_size(value, name):
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be a valid integer')
+
+
+def parse_date(value, name):
+    if value in (None, ''):
+        return None
+    parsed = parse_datetime(str(value))
+    if parsed is None:
+        raise ValueError(f'{name} must be an ISO 8601 datetime')
+    return parsed
+
+
+def search_files(user, params):
+    """
+    根据搜索参数构造查询集（未排序、未分页），参数不合法时抛出 ValueError
+
+    支持的参数：query、mode（substring / prefix）、content_type、size_min、size_max、
+    created_after、created_before、path（目录前缀，包含子孙目录）
+    """
+    queryset = File.objects.filter(user=user, is_deleted=False)
+
+    query = (params.get('query') or '').strip()
+    mode = params.get('mode') or 'substring'
+    if mode not in ('substring', 'prefix'):
+        raise ValueError('mode must be substring or prefix')
+    if query:
+        queryset = match_name(queryset, query, prefix=mode == 'prefix')
+
+    content_type = params.get('content_type')
+    if isinstance(content_type, list):
+        queryset = queryset.filter(content_type__in=content_type)
+    elif content_type:
+        queryset = queryset.filter(content_type=content_type)
+
+    size_min = parse_size(params.get('size_min'), 'size_min')
+    size_max = parse_size(params.get('size_max'), 'size_max')
+    if size_min is not None:
+        queryset = queryset.filter(size__gte=size_min)
+    if size_max is not None:
+        queryset = queryset.filter(size__lte=size_max)
+
+    created_after = parse_date(params.get('created_after'), 'created_after')
+    created_before = parse_date(params.get('created_before'), 'created_before')
+    if created_after is not None:
+        queryset = queryset.filter(created_at__gte=created_after)
+    if created_before is not None:
+        queryset = queryset.filter(created_at__lt=created_before)
+
+    path = params.get('path')
+    if path and normalize_folder_path(path) != '/':
+        lower, upper = subtree_range(normalize_folder_path(path))
+        queryset = queryset.filter(path__gte=lower, path__lt=upper)
+
+    return queryset
@@ -19,11 +19,25 @@ class FileSerializer(serializers.ModelSerializer):
         
     def get_user_id(self, obj):
         """
-        安全地获取用户ID，处理user字段可能为null的情况
+        直接读取外键列，避免为每条记录加载 User
         """
-        if obj.user and hasattr(obj.user, 'id'):
-            return obj.user.id
-        return None
+        return obj.user_id
+
+# 列表接口使用的字段，与 FileSerializer 输出保持一致
+FILE_LIST_FIELDS = FileSerializer.Meta.fields
+
+
+def serialize_file_rows(rows):
+    """
+    快速序列化 .values(*FILE_LIST_FIELDS) 返回的字典行
+
+    不构造模型实例和逐字段的 Serializer，输出格式与 FileSerializer 相同
+    """
+    created_at_field = serializers.DateTimeField()
+    for row in rows:
+        row['created_at'] = created_at_field.to_representation(row['created_at'])
+        yield row
+
 
 class FileUploadSerializer(serializers.ModelSerializer):
     class Meta:
@@ -41,6 +55,7 @@ class FileUploadSerializer(serializers.ModelSerializer):
 
 class DropSerializer(serializers.ModelSerializer):
     user_id = serializers.SerializerMethodField()
+    is_expired = serializers.SerializerMethodField()
     
     class Meta:
         model = Drop
@@ -48,11 +63,12 @@ class DropSerializer(serializers.ModelSerializer):
         
     def get_user_id(self, obj):
         """
-        安全地获取用户ID，处理user字段可能为null的情况
+        直接读取外键列，避免为每条记录加载 User
         """
-        if obj.user and hasattr(obj.user, 'id'):
-            return obj.user.id
-        return None
+        return obj.user_id
+
+    def get_is_expired(self, obj):
+        return obj.has_expired
 
 class DropCreateSerializer(serializers.ModelSerializer):
     class Meta:
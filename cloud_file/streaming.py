@@ -0,0 +1,40 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+
+class AsyncStream:
+    """
+    将同步迭代器包装为异步迭代器，每次取下一块都在线程中执行
+
+    Django 4.2 在 ASGI 下遇到同步迭代器时会先用 sync_to_async(list) 读完全部内容再输出，
+    大文件会整体缓存在内存中。线程使用默认的 thread_sensitive=True，同一请求的各次读取
+    都在同一线程中执行（迭代器中的数据库游标不会跨线程使用）
+    """
+
+    def __init__(self, iterable):
+        self.iterable = iterable
+        self.iterator = iter(iterable)
+
+    async def __aiter__(self):
+        next_chunk = sync_to_async(next)
+        while True:
+            chunk = await next_chunk(self.iterator, None)
+            if chunk is None:
+                return
+            yield chunk
+
+    def close(self):
+        # ASGIHandler 在线程中调用 response.close()
+        close = getattr(self.iterable, 'close', None)
+        if close is not None:
+            close()
+
+
+def streaming_response(request, iterable, **kwargs):
+    """
+    创建流式响应：WSGI 下直接使用同步迭代器，ASGI 下包装为异步迭代器，两种部署都逐块输出
+    """
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        iterable = AsyncStream(iterable)
+    return StreamingHttpResponse(iterable, **kwargs)
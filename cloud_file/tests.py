@@ -1,3 +1,138 @@
-from django.test import TestCase
+import io
+import zipfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from cloud_auth.models import User
+from .models import Drop, File
+from .oss_utils import get_oss_client
+from .streaming import AsyncStream
+from .zipstream import archive_entries, stream_zip
+
+
+class ListQueryCountTests(TestCase):
+    """
+    列表接口的查询次数与文件数量无关（不按行加载 User）
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_files(self, count, path='/'):
+        return File.objects.bulk_create(
+            File(user=self.user, name=f'file{index}', content_type='text/plain', size=1, path=path)
+            for index in range(count)
+        )
+
+    def count_queries(self, *args, **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(*args, format='json', **kwargs)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_list_files_constant_queries(self):
+        self.create_files(3, path='/small/')
+        self.create_files(50, path='/large/')
+
+        small, _ = self.count_queries('/file/list/', {'path': '/small/'})
+        large, response = self.count_queries('/file/list/', {'path': '/large/', 'page_size': 100})
+
+        self.assertEqual(len(response.data['files']), 50)
+        self.assertEqual(small, large)
+        with self.assertNumQueries(1):
+            self.client.post('/file/list/', {'path': '/large/', 'page_size': 20}, format='json')
+
+    def test_get_drop_constant_queries(self):
+        small = Drop.objects.create(user=self.user, code='small', expire_time=timezone.now() + timedelta(days=1), max_download_count=10)
+        small.files.set(self.create_files(3))
+        large = Drop.objects.create(user=self.user, code='large', expire_time=timezone.now() + timedelta(days=1), max_download_count=10)
+        large.files.set(self.create_files(50))
+
+        small_queries, _ = self.count_queries('/drop/get-drop/', {'code': 'small'})
+        large_queries, response = self.count_queries('/drop/get-drop/', {'code': 'large'})
+
+        self.assertEqual(len(response.data['files']), 50)
+        self.assertEqual(small_queries, large_queries)
+
+
+class FakeObject:
+    """
+    模拟 OSS get_object 的流式响应
+    """
+
+    def __init__(self, data):
+        self.status_code = 200
+        self.data = data
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.data), chunk_size):
+            yield self.data[start:start + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class StreamZipTests(SimpleTestCase):
+    """
+    流式打包的内容与 OSS 对象逐字节一致，包内路径不会越出解压目录
+    """
+
+    objects = {
+        'alice/a.txt': b'hello',
+        'alice/big.bin': bytes(range(256)) * 1024,
+        'alice/empty': b'',
+    }
+
+    def build(self, entries, prefetch):
+        with mock.patch.object(get_oss_client(), 'get_object', side_effect=lambda key: FakeObject(self.objects[key])):
+            return b''.join(stream_zip(entries, prefetch=prefetch))
+
+    def test_contents_identical(self):
+        now = timezone.now()
+        entries = [('dir/', None, now)] + [(f'dir/{key}', key, now) for key in self.objects]
+
+        data = self.build(entries, prefetch=1)
+        self.assertEqual(data, self.build(entries, prefetch=4))
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(archive.namelist(), [entry[0] for entry in entries])
+            for arcname, key, _ in entries[1:]:
+                self.assertEqual(archive.read(arcname), self.objects[key])
+
+    def test_async_stream_identical(self):
+        entries = [(key, key, timezone.now()) for key in self.objects]
+
+        async def collect(stream):
+            return [chunk async for chunk in stream]
+
+        with mock.patch.object(get_oss_client(), 'get_object', side_effect=lambda key: FakeObject(self.objects[key])):
+            chunks = async_to_sync(collect)(AsyncStream(stream_zip(entries, prefetch=2)))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b''.join(chunks), self.build(entries, prefetch=2))
+
+    def test_arcnames_sanitized(self):
+        now = timezone.now()
+        roots = [
+            {'name': name, 'content_type': 'text/plain', 'oss_url': 'https://bucket.oss/alice/a.txt', 'created_at': now}
+            for name in ('../../etc/passwd', '/abs', 'a\\..\\b', '..', 'a.txt', 'a.txt')
+        ]
+        names = [arcname for arcname, _, _ in archive_entries(roots)]
+        self.assertEqual(names, ['.._.._etc_passwd', '_abs', 'a_.._b', '_', 'a.txt', 'a (1).txt'])
@@ -0,0 +1,107 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from .jobs import enqueue_abort_multipart
+from .models import UploadSession
+
+
+# 上传会话有效期，与上传凭证和配额预留保持一致
+SESSION_TIMEOUT = 3600
+
+
+class CacheUploadSessionStore:
+    """
+    基于 Django 缓存的上传会话存储，多进程/多节点部署时需要配置共享缓存（如 Redis）
+    """
+
+    def __init__(self, alias='default'):
+        self.cache = caches[alias]
+
+    @staticmethod
+    def key(upload_id):
+        return f"upload_token_{upload_id}"
+
+    def put_many(self, sessions, timeout=SESSION_TIMEOUT):
+        self.cache.set_many({self.key(upload_id): info for upload_id, info in sessions.items()}, timeout=timeout)
+
+    def get_many(self, upload_ids):
+        found = self.cache.get_many([self.key(upload_id) for upload_id in upload_ids])
+        return {
+            upload_id: found[self.key(upload_id)]
+            for upload_id in upload_ids
+            if self.key(upload_id) in found
+        }
+
+    def delete_many(self, upload_ids):
+        self.cache.delete_many([self.key(upload_id) for upload_id in upload_ids])
+
+    def sweep(self, batch_size=1000):
+        # 缓存条目自行过期，过期的分片上传需依赖 OSS 生命周期规则清理
+        return 0
+
+
+class DatabaseUploadSessionStore:
+    """
+    基于数据库表的上传会话存储，所有 worker 共享，过期记录由 sweep_upload_sessions 清理
+    """
+
+    def put_many(self, sessions, timeout=SESSION_TIMEOUT):
+        expires_at = timezone.now() + timedelta(seconds=timeout)
+        UploadSession.objects.bulk_create([
+            UploadSession(upload_id=upload_id, user_id=info['user'], data=info, expires_at=expires_at)
+            for upload_id, info in sessions.items()
+        ])
+
+    def get_many(self, upload_ids):
+        return dict(
+            UploadSession.objects.filter(
+                upload_id__in=list(upload_ids),
+                expires_at__gt=timezone.now(),
+            ).values_list('upload_id', 'data')
+        )
+
+    def delete_many(self, upload_ids):
+        UploadSession.objects.filter(upload_id__in=list(upload_ids)).delete()
+
+    def sweep(self, batch_size=1000):
+        """
+        删除一批过期会话，返回删除条数
+
+        过期的分片上传会话同时登记后台任务取消 OSS 上的分片上传，避免已上传的分片持续计费
+        """
+        with transaction.atomic():
+            rows = list(
+                UploadSession.objects.select_for_update()
+                .filter(expires_at__lte=timezone.now())
+                .values_list('id', 'data')[:batch_size]
+            )
+            if not rows:
+                return 0
+            enqueue_abort_multipart([
+                (data['oss_key'], data['oss_upload_id'])
+                for _, data in rows
+                if data.get('multipart')
+            ])
+            return UploadSession.objects.filter(id__in=[session_id for session_id, _ in rows]).delete()[0]
+
+
+BACKENDS = {
+    'db': DatabaseUploadSessionStore,
+    'cache': CacheUploadSessionStore,
+}
+
+_store = None
+
+
+def get_store():
+    """
+    获取配置的上传会话存储（UPLOAD_SESSION_BACKEND: db / cache）
+    """
+    global _store
+    if _store is None:
+        _store = BACKENDS[settings.UPLOAD_SESSION_BACKEND]()
+    return _store
@@ -1,15 +1,413 @@
 from django.shortcuts import render
-from rest_framework import viewsets, status
-from rest_framework.permissions import IsAuthenticated
-from .models import File, Drop
-from .serializers import FileSerializer, FileUploadSerializer, DropSerializer
+from rest_framework import serializers, viewsets, status
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from .models import File, Drop, normalize_folder_path, subtree_range
+from .serializers import FileSerializer, FileUploadSerializer, DropSerializer, FILE_LIST_FIELDS, serialize_file_rows
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from .oss_utils import OSSTokenGenerator
+from .oss_utils import OSS_MAX_PARTS, OSS_MIN_PART_SIZE, get_oss_client, oss_key_from_url
+from .jobs import enqueue_oss_delete
+from . import quota
+from .drop_counters import count_download
+from . import drop_cache
+from . import upload_sessions
+from . import dedup
+from .search import search_files
+from .zipstream import archive_entries, stream_zip
+from .proxy import proxy_response
+from .streaming import streaming_response
 import hashlib
-from django.core.cache import cache
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
 from django.utils import timezone
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Greatest, Substr
+from cloud_auth.models import User
+from cloud_auth.authentication import CachedJWTAuthentication, invalidate_user
+from urllib.parse import quote
+from rest_framework.utils.encoders import JSONEncoder
+from .pagination import InvalidCursor, keyset_page, order_keyset, parse_sort
+
+STREAM_CHUNK_SIZE = 2000
+# 批量接口单次请求最多处理的文件数
+MAX_BATCH_SIZE = 1000
+
+
+def stream_file_list(queryset, user):
+    """
+    以流式 JSON 输出整个目录，使用 iterator() 分块读取，内存占用与目录大小无关
+
+    每 STREAM_CHUNK_SIZE 行输出一块，ASGI 下每块只需切换一次线程
+    """
+    encoder = JSONEncoder(ensure_ascii=False)
+    yield '{"files": ['
+    rows = queryset.values(*FILE_LIST_FIELDS).iterator(chunk_size=STREAM_CHUNK_SIZE)
+    batch = []
+    separator = ''
+    for row in serialize_file_rows(rows):
+        batch.append(encoder.encode(row))
+        if len(batch) >= STREAM_CHUNK_SIZE:
+            yield separator + ','.join(batch)
+            batch = []
+            separator = ','
+    if batch:
+        yield separator + ','.join(batch)
+    yield '], "quota": %d, "used_space": %d, "message": "Success"}' % (user.quota, user.used_space)
+
+
+def parse_file_size(value):
+    """
+    校验客户端申报的文件大小，必须为正整数，否则抛出 ValueError
+    """
+    try:
+        file_size = int(value)
+    except (ValueError, TypeError):
+        raise ValueError('file_size must be a valid integer')
+    if file_size <= 0:
+        raise ValueError('file_size must be a positive integer')
+    return file_size
+
+
+def validate_file_name(file_name):
+    """
+    校验客户端提交的文件名：不能为空、不能包含路径分隔符，也不能是 "." 或 ".."
+
+    文件名会作为目录树中的名称，分片上传时还会拼入OSS对象路径
+    """
+    if not isinstance(file_name, str) or not file_name.strip():
+        raise ValueError('file_name must not be empty')
+    if '/' in file_name or '\\' in file_name or file_name in ('.', '..'):
+        raise ValueError('file_name must not contain path separators or be "." or ".."')
+    return file_name
+
+
+def new_upload_id(user, file_name, file_size):
+    return hashlib.md5(f"{user.id}_{file_name}_{file_size}_{timezone.now().timestamp()}".encode()).hexdigest()
+
+
+def drop_access_error(drop, user, password):
+    """
+    校验分享的访问权限，拒绝访问时返回 (错误信息, 状态码)，否则返回 None
+    """
+    if drop.has_expired:
+        return 'Drop expired', status.HTTP_400_BAD_REQUEST
+
+    if drop.require_login and not user.is_authenticated:
+        return 'Please login', status.HTTP_401_UNAUTHORIZED
+
+    if drop.password and drop.password != password:
+        return 'Wrong password', status.HTTP_403_FORBIDDEN
+
+    return None
+
+
+def resolve_drop(request, code, password):
+    """
+    根据分享码获取分享（优先读缓存）并校验访问权限，返回 (drop, 文件行列表, 错误响应)
+    """
+    resolved = drop_cache.get_drop(code)
+    if resolved is None:
+        return None, None, Response({'error': 'Invalid code'}, status=status.HTTP_404_NOT_FOUND)
+    drop, files = resolved
+
+    error = drop_access_error(drop, request.user, password)
+    if error:
+        message, error_status = error
+        return None, None, Response({'error': message}, status=error_status)
+
+    return drop, files, None
+
+
+def drop_password(request):
+    """
+    读取分享密码：请求头 X-Drop-Password 或请求体 password，不从 URL 读取（避免写入访问日志与浏览器历史）
+    """
+    return request.headers.get('X-Drop-Password') or request.data.get('password', '')
+
+
+def issue_upload_token(user, file_name, file_size, content_type, sha256=None):
+    """
+    预留配额、登记上传会话并签发上传凭证，配额不足时返回 None
+
+    Returns:
+        tuple: (upload_id, 上传凭证)
+    """
+    upload_id = new_upload_id(user, file_name, file_size)
+
+    # 预留配额，并发的多个上传不会同时通过校验
+    if not quota.reserve(user.id, {upload_id: file_size}):
+        return None
+
+    file_info = {
+        'user': user.id,
+        'file_name': file_name,
+        'file_size': file_size,
+        'content_type': content_type,
+        'upload_id': upload_id,
+        'sha256': sha256,
+    }
+    upload_sessions.get_store().put_many({upload_id: file_info})  # 有效期1小时
+
+    # 生成上传token
+    return upload_id, get_oss_client().generate_upload_token(user.username, file_size)
+
+
+def multipart_layout(file_size, part_size=None):
+    """
+    计算分片大小与分片数：不小于 OSS 最小分片，且分片数不超过 OSS 上限
+    """
+    part_size = max(int(part_size or settings.MULTIPART_PART_SIZE), OSS_MIN_PART_SIZE)
+    part_size = max(part_size, -(-file_size // OSS_MAX_PARTS))
+    return part_size, max(-(-file_size // part_size), 1)
+
+
+def get_multipart_session(user, upload_id):
+    """
+    读取并校验分片上传会话，返回 (会话, 错误响应)
+    """
+    if not upload_id:
+        return None, Response({'error': 'upload_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+    session = upload_sessions.get_store().get_many([upload_id]).get(upload_id)
+    if not session or not session.get('multipart'):
+        return None, Response({
+            'error': 'Invalid or expired upload_id',
+            'message': 'Upload session not found'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if session['user'] != user.id:
+        return None, Response({
+            'error': 'Permission denied',
+            'message': 'Upload session belongs to different user'
+        }, status=status.HTTP_403_FORBIDDEN)
+    return session, None
+
+
+def instant_upload(user, blob, file_name, file_size, content_type, path):
+    """
+    秒传：客户端已通过持有证明时，直接创建引用该共享对象的文件记录
+
+    Returns:
+        tuple: (File 或 None, 是否配额不足)，共享对象已被删除时返回 (None, False)
+    """
+    path = normalize_folder_path(path)
+    parent = File.objects.folder_at(user, path)
+
+    with transaction.atomic():
+        if not dedup.acquire(blob):
+            return None, False
+
+        # 没有预留的上传按当前剩余配额直接扣减
+        if not quota.commit(user.id, {new_upload_id(user, file_name, file_size): file_size}):
+            transaction.set_rollback(True)
+            return None, True
+
+        file = File.objects.create(
+            user=user,
+            parent=parent,
+            blob=blob,
+            name=file_name,
+            content_type=content_type or 'application/octet-stream',
+            size=file_size,
+            oss_url=blob.oss_url,
+            path=path,
+            is_deleted=False
+        )
+    return file, False
+
+
+def instant_upload_result(user, data, sha256, file_name, file_size, content_type):
+    """
+    处理获取上传凭证时的秒传流程（同步与异步接口共用）
+
+    未提交 challenge 时，存在可秒传的共享对象则返回持有证明挑战；提交了 challenge 与 proof 时
+    校验证明并创建文件记录
+
+    Returns:
+        tuple: (响应数据, 状态码)，需要按正常流程上传时返回 None
+    """
+    challenge = data.get('challenge')
+    if not challenge:
+        blob = dedup.find(sha256, file_size)
+        if blob is None:
+            return None
+        return {
+            'challenge': dedup.issue_challenge(user.id, blob),
+            'message': 'Proof of possession required'
+        }, status.HTTP_200_OK
+
+    blob = dedup.check_proof(user.id, sha256, file_size, challenge, data.get('proof'))
+    if blob is None:
+        return {
+            'error': 'Invalid or expired proof',
+            'message': 'Proof of possession failed'
+        }, status.HTTP_403_FORBIDDEN
+    file, quota_exceeded = instant_upload(user, blob, file_name, file_size, content_type, data.get('path', '/'))
+    if quota_exceeded:
+        return {'error': 'Storage quota exceeded'}, status.HTTP_400_BAD_REQUEST
+    if file is None:
+        return None
+    return {
+        'instant': True,
+        'file': FileSerializer(file).data,
+        'message': 'Success'
+    }, status.HTTP_201_CREATED
+
+
+def complete_upload(user, session, oss_url, oss_key, path):
+    """
+    上传完成后将预留配额转为已用空间并创建文件记录，配额不足时登记删除 OSS 文件并返回 False
+    """
+    upload_id = session['upload_id']
+    declared_size = session['file_size']
+    path = normalize_folder_path(path)
+    parent = File.objects.folder_at(user, path)
+
+    with transaction.atomic():
+        # 将预留的配额转为已用空间（预留过期时按剩余配额重新检查）
+        committed = quota.commit(user.id, {upload_id: declared_size})
+
+        if committed:
+            # 客户端提供了哈希时登记为待验证的共享对象：只接受当前用户目录下、
+            # 且没有被其他文件记录引用的对象（校验通过后原对象会被删除）
+            blob = None
+            if (
+                session.get('sha256')
+                and oss_key_from_url(oss_url).startswith(f"{user.username}/")
+                and not File.objects.filter(oss_url=oss_url).exists()
+            ):
+                blob = dedup.register(session['sha256'], oss_url, declared_size)
+
+            # 创建文件记录（使用客户端传入的实际 OSS URL）
+            File.objects.create(
+                user=user,
+                parent=parent,
+                blob=blob,
+                name=session['file_name'],
+                content_type=session.get('content_type') or 'application/octet-stream',
+                size=declared_size,
+                oss_url=oss_url,
+                path=path,
+                is_deleted=False
+            )
+        else:
+            # 文件已上传到OSS，但配额不足，登记后台任务删除OSS文件
+            enqueue_oss_delete([oss_key])
+
+    if committed:
+        # 清除上传会话
+        upload_sessions.get_store().delete_many([upload_id])
+    return committed
+
+
+def parse_file_ids(file_ids):
+    """
+    校验批量接口传入的文件 ID 列表
+    """
+    if not isinstance(file_ids, list) or not file_ids:
+        raise ValueError('ids must be a non-empty list')
+    if len(file_ids) > MAX_BATCH_SIZE:
+        raise ValueError(f'At most {MAX_BATCH_SIZE} ids per request')
+    try:
+        return [int(file_id) for file_id in file_ids]
+    except (TypeError, ValueError):
+        raise ValueError('ids must be integers')
+
+
+def parse_bool(value):
+    """
+    按 DRF BooleanField 的规则解析布尔参数（"false"、"0" 等字符串视为 False），无法识别时抛出 ValueError
+    """
+    try:
+        return serializers.BooleanField().to_internal_value(value)
+    except serializers.ValidationError:
+        raise ValueError(f'Invalid boolean value: {value!r}')
+
+
+def batch_download_urls(rows, file_ids=None):
+    """
+    为文件行生成下载链接（跳过文件夹），返回 (id -> 链接, 无法下载的 id 列表)
+    """
+    if file_ids is not None:
+        wanted = set(file_ids)
+        rows = [row for row in rows if row['id'] in wanted]
+
+    token_generator = get_oss_client()
+    download_urls = {
+        row['id']: token_generator.generate_download_url(row['oss_url'])
+        for row in rows
+        if row['content_type'] != 'folder'
+    }
+    missing = [file_id for file_id in file_ids or [] if file_id not in download_urls]
+    return download_urls, missing
+
+
+def soft_delete_subtree(user, file):
+    """
+    逻辑删除文件（文件夹则包含全部子孙项），并原子地释放占用空间
+
+    使用一条批量 UPDATE 标记删除，按实际标记的行计算释放空间，一条条件 UPDATE 扣减 used_space，
+    返回 (删除条数, 释放字节数, 待删除的OSS对象路径列表)
+    """
+    targets = File.objects.subtree(file)
+    drop_cache.invalidate(drop_cache.codes_for_files(targets))
+
+    # 只统计本次 UPDATE 实际标记删除的行（以本次的删除时间区分），
+    # 并发或重复删除同一子树时每条记录只会被释放一次
+    deleted_at = timezone.now()
+    deleted = targets.update(is_deleted=True, deleted_at=deleted_at)
+    flipped = File.objects.subtree(file, is_deleted=True).filter(deleted_at=deleted_at)
+
+    freed = 0
+    oss_keys = []
+    blob_counts = Counter()
+    for content_type, size, oss_url, blob_id in flipped.values_list('content_type', 'size', 'oss_url', 'blob_id').iterator():
+        if content_type == 'folder':
+            continue
+        freed += size
+        # 共享对象按引用计数，最后一个引用删除时才删除OSS对象
+        if blob_id:
+            blob_counts[blob_id] += 1
+            continue
+        oss_key = oss_key_from_url(oss_url)
+        # 只删除当前用户目录下的对象
+        if oss_key.startswith(f"{user.username}/"):
+            oss_keys.append(oss_key)
+
+    if blob_counts:
+        oss_keys.extend(dedup.release(blob_counts))
+    if freed:
+        User.objects.filter(pk=user.pk).update(used_space=Greatest(F('used_space') - freed, 0))
+        invalidate_user(user.pk)
+    return deleted, freed, oss_keys
+
+
+def move_subtree(folder, old_prefix):
+    """
+    文件夹重命名/移动后，用一条 UPDATE 将全部子孙项 path 中的旧前缀替换为新前缀
+
+    子孙项的 parent 外键不变，只有被移动的文件夹本身需要更新 parent
+    """
+    new_prefix = folder.folder_path
+    if new_prefix == old_prefix:
+        return 0
+    lower, upper = subtree_range(old_prefix)
+    return File.objects.filter(
+        user_id=folder.user_id,
+        path__gte=lower,
+        path__lt=upper,
+        is_deleted=False,
+    ).update(path=Concat(Value(new_prefix), Substr('path', len(old_prefix) + 1)))
+
+
+def zip_response(request, roots, archive_name):
+    """
+    将文件/文件夹行打包为 ZIP64 流式响应，边从 OSS 读取边输出
+    """
+    response = streaming_response(request, stream_zip(archive_entries(roots)), content_type='application/zip')
+    response['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(archive_name)}.zip"
+    return response
+
 
 # Create your views here.
 class FileViewSet(viewsets.ModelViewSet):
@@ -25,31 +423,66 @@ class FileViewSet(viewsets.ModelViewSet):
             return File.objects.none()
         return File.objects.filter(user=user, is_deleted=False)
 
+    def perform_destroy(self, instance):
+        """
+        默认的 DELETE 路由：删除前查出包含该文件的分享，提交后清除其缓存
+        """
+        with transaction.atomic():
+            codes = drop_cache.codes_for_files([instance.pk])
+            instance.delete()
+            drop_cache.invalidate(codes)
+
     @action(
         detail=False,
         methods=['post'], 
-        url_path='list'
+        url_path='list',
+        authentication_classes=[CachedJWTAuthentication]
     )
     def list_files(self, request):
         """
-        根据路径获取文件列表
+        根据路径获取文件列表（键集分页，可选流式输出）
         """
         try:
             user = request.user
             path = request.data.get('path', '/')
-            
-            queryset = File.objects.filter(
-                user=user,
-                path=path,
-                is_deleted=False
+            sort = request.data.get('sort', 'name')
+
+            queryset = File.objects.children_of(user, path)
+
+            try:
+                stream = parse_bool(request.data.get('stream', False))
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            if stream:
+                field, descending = parse_sort(sort)
+                queryset = order_keyset(queryset, field, descending)
+                return streaming_response(
+                    request,
+                    stream_file_list(queryset, user),
+                    content_type='application/json',
+                )
+
+            files, next_cursor = keyset_page(
+                queryset.values(*FILE_LIST_FIELDS),
+                sort=sort,
+                cursor=request.data.get('cursor'),
+                page_size=request.data.get('page_size'),
             )
             
             return Response({
-                'files': FileSerializer(queryset, many=True).data,
+                'files': list(serialize_file_rows(files)),
+                'next_cursor': next_cursor,
                 'quota': user.quota,
                 'used_space': user.used_space,
                 'message': 'Success'
             }, status=status.HTTP_200_OK)
+
+        except InvalidCursor as e:
+            return Response({
+                'error': str(e),
+                'message': 'Invalid pagination parameters'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
         except Exception as e:
             return Response({
@@ -57,6 +490,47 @@ class FileViewSet(viewsets.ModelViewSet):
                 'message': 'Failed'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='search',
+        authentication_classes=[CachedJWTAuthentication]
+    )
+    def search(self, request):
+        """
+        按文件名搜索当前用户的文件（可按类型、大小、时间、目录过滤，键集分页）
+        """
+        try:
+            try:
+                queryset = search_files(request.user, request.data)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            files, next_cursor = keyset_page(
+                queryset.values(*FILE_LIST_FIELDS),
+                sort=request.data.get('sort', 'name'),
+                cursor=request.data.get('cursor'),
+                page_size=request.data.get('page_size'),
+            )
+
+            return Response({
+                'files': list(serialize_file_rows(files)),
+                'next_cursor': next_cursor,
+                'message': 'Success'
+            }, status=status.HTTP_200_OK)
+
+        except InvalidCursor as e:
+            return Response({
+                'error': str(e),
+                'message': 'Invalid pagination parameters'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        except Exception as e:
+            return Response({
+                'error': str(e),
+                'message': 'Failed'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
     @action(detail=False, methods=['post'], url_path='get-token')
     def get_upload_token(self, request):
         """
@@ -71,30 +545,28 @@ class FileViewSet(viewsets.ModelViewSet):
             if not all([file_name, file_size]):
                 return Response({'error': 'Need file_name and file_size'}, status=status.HTTP_400_BAD_REQUEST)
             
-            # 确保file_size是整数类型
+            # 校验文件名，并确保file_size是正整数
             try:
-                file_size = int(file_size)
-            except (ValueError, TypeError):
-                return Response({'error': 'file_size must be a valid integer'}, status=status.HTTP_400_BAD_REQUEST)
+                file_name = validate_file_name(file_name)
+                file_size = parse_file_size(file_size)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
             
-            if user.used_space + file_size > user.quota:
-                return Response({'error': 'Storage quota exceeded'}, status=status.HTTP_400_BAD_REQUEST)
-
-            token_generator = OSSTokenGenerator()
-
-            upload_id = hashlib.md5(f"{user.id}_{file_name}_{file_size}_{timezone.now().timestamp()}".encode()).hexdigest()
+            try:
+                sha256 = dedup.normalize_sha256(request.data.get('sha256'))
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-            file_info = {
-                'user': user.id,
-                'file_name': file_name,
-                'file_size': file_size,
-                'content_type': content_type,
-                'upload_id': upload_id,
-            }
-            cache.set(f"upload_token_{upload_id}", file_info, timeout=3600)  # 缓存1小时
+            # 秒传：已有相同内容的对象时，客户端需先对服务端随机指定的区间计算哈希证明持有文件
+            if sha256:
+                result = instant_upload_result(user, request.data, sha256, file_name, file_size, content_type)
+                if result is not None:
+                    return Response(*result)
 
-            # 生成上传token
-            upload_token = token_generator.generate_upload_token(user.username, file_size)
+            issued = issue_upload_token(user, file_name, file_size, content_type, sha256)
+            if issued is None:
+                return Response({'error': 'Storage quota exceeded'}, status=status.HTTP_400_BAD_REQUEST)
+            upload_id, upload_token = issued
             
             return Response({
                 'token': upload_token,
@@ -121,8 +593,8 @@ class FileViewSet(viewsets.ModelViewSet):
                     'message': 'Missing upload_id'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # 从缓存中获取上传信息
-            cached_info = cache.get(f"upload_token_{upload_id}")
+            # 从上传会话存储中获取上传信息
+            cached_info = upload_sessions.get_store().get_many([upload_id]).get(upload_id)
             if not cached_info:
                 return Response({
                     'error': 'Invalid or expired upload_id',
@@ -135,11 +607,11 @@ class FileViewSet(viewsets.ModelViewSet):
                     'error': 'Permission denied',
                     'message': 'Upload session belongs to different user'
                 }, status=status.HTTP_403_FORBIDDEN)
+
+            if cached_info.get('multipart'):
+                return Response({'error': 'Use multipart/complete for multipart uploads'}, status=status.HTTP_400_BAD_REQUEST)
             
-            # 从 OSS 校验文件实际大小
-            token_generator = OSSTokenGenerator()
             # OSS文件路径应该与客户端上传时使用的路径一致
-            
             oss_url = request.data.get('oss_url')
             if not oss_url:
                 return Response({
@@ -173,41 +645,12 @@ class FileViewSet(viewsets.ModelViewSet):
             #         'message': 'File size verification failed'
             #     }, status=status.HTTP_400_BAD_REQUEST)
             
-            # 重新检查用户配额（使用实际文件大小）
-            # if user.used_space + actual_file_size > user.quota:
-            if user.used_space + declared_size > user.quota:
-                # 文件已上传到OSS，但配额不足，需要删除OSS文件
-                try:
-                    token_generator.delete_file(oss_key)
-                except:
-                    pass  # 删除失败不影响返回错误
-                
+            if not complete_upload(user, cached_info, oss_url, oss_key, request.data.get('path', '/')):
                 return Response({
                     'error': 'Storage quota exceeded after upload',
                     'message': 'Insufficient storage space'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # 获取其他上传信息
-            path = request.data.get('path', '/')
-            
-            # 创建文件记录（使用客户端传入的实际 OSS URL）
-            File.objects.create(
-                user=user,
-                name=cached_info['file_name'],
-                content_type=cached_info.get('content_type', 'application/octet-stream'),
-                size=declared_size,
-                oss_url=oss_url,
-                path=path,
-                is_deleted=False
-            )
-            
-            # 更新用户已使用空间
-            user.used_space += declared_size
-            user.save()
-            
-            # 清除缓存
-            cache.delete(f"upload_token_{upload_id}")
-            
             return Response({
                 'message': 'File uploaded successfully'
             }, status=status.HTTP_201_CREATED)
@@ -218,7 +661,353 @@ class FileViewSet(viewsets.ModelViewSet):
                 'message': 'Failed to create file record'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
-    @action(detail=False, methods=['get'], url_path='storage-info')
+    @action(detail=False, methods=['post'], url_path='get-token-batch')
+    def get_upload_token_batch(self, request):
+        """
+        批量获取阿里云OSS上传token，总大小只校验一次配额
+        """
+        try:
+            user = request.user
+            files = request.data.get('files')
+
+            if not isinstance(files, list) or not files:
+                return Response({'error': 'Need files'}, status=status.HTTP_400_BAD_REQUEST)
+            if len(files) > MAX_BATCH_SIZE:
+                return Response({'error': f'At most {MAX_BATCH_SIZE} files per request'}, status=status.HTTP_400_BAD_REQUEST)
+
+            entries = []
+            for item in files:
+                file_name = item.get('file_name') if isinstance(item, dict) else None
+                file_size = item.get('file_size') if isinstance(item, dict) else None
+                if not all([file_name, file_size]):
+                    return Response({'error': 'Need file_name and file_size'}, status=status.HTTP_400_BAD_REQUEST)
+                try:
+                    file_name = validate_file_name(file_name)
+                    file_size = parse_file_size(file_size)
+                except ValueError as e:
+                    return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+                entries.append((file_name, file_size, item.get('content_type')))
+
+            token_generator = get_oss_client()
+
+            sessions = {}
+            tokens = []
+            for index, (file_name, file_size, content_type) in enumerate(entries):
+                # 同一批次内时间戳可能相同，追加序号保证唯一
+                upload_id = new_upload_id(user, f"{file_name}_{index}", file_size)
+                sessions[upload_id] = {
+                    'user': user.id,
+                    'file_name': file_name,
+                    'file_size': file_size,
+                    'content_type': content_type,
+                    'upload_id': upload_id,
+                }
+                tokens.append({
+                    'file_name': file_name,
+                    'token': token_generator.generate_upload_token(user.username, file_size),
+                    'upload_id': upload_id,
+                })
+
+            # 按总大小一次性预留配额
+            if not quota.reserve(user.id, {upload_id: info['file_size'] for upload_id, info in sessions.items()}):
+                return Response({'error': 'Storage quota exceeded'}, status=status.HTTP_400_BAD_REQUEST)
+
+            upload_sessions.get_store().put_many(sessions)  # 有效期1小时
+
+            return Response({
+                'tokens': tokens,
+                'message': 'Success'
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return Response({
+                'error': str(e),
+                'message': 'Failed'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['post'], url_path='uploaded-batch')
+    def uploaded_batch(self, request):
+        """
+        批量申报上传完成：一次读取上传会话、bulk_create 创建记录、一次原子更新已用空间
+        """
+        try:
+            user = request.user
+            files = request.data.get('files')
+
+            if not isinstance(files, list) or not files:
+                return Response({'error': 'Need files'}, status=status.HTTP_400_BAD_REQUEST)
+            if len(files) > MAX_BATCH_SIZE:
+                return Response({'error': f'At most {MAX_BATCH_SIZE} files per request'}, status=status.HTTP_400_BAD_REQUEST)
+
+            upload_ids = []
+            for item in files:
+                if not isinstance(item, dict) or not item.get('upload_id') or not item.get('oss_url'):
+                    return Response({
+                        'error': 'upload_id and oss_url are required',
+                        'message': 'Missing upload_id or oss_url'
+                    }, status=status.HTTP_400_BAD_REQUEST)
+                upload_ids.append(str(item['upload_id']))
+            if len(set(upload_ids)) != len(upload_ids):
+                return Response({'error': 'Duplicate upload_id'}, status=status.HTTP_400_BAD_REQUEST)
+
+            sessions = upload_sessions.get_store().get_many(upload_ids)
+            missing = [upload_id for upload_id in upload_ids if upload_id not in sessions]
+            if missing:
+                return Response({
+                    'error': 'Invalid or expired upload_id',
+                    'upload_ids': missing,
+                    'message': 'Upload session not found'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            if any(info['user'] != user.id for info in sessions.values()):
+                return Response({
+                    'error': 'Permission denied',
+                    'message': 'Upload session belongs to different user'
+                }, status=status.HTTP_403_FORBIDDEN)
+            if any(info.get('multipart') for info in sessions.values()):
+                return Response({'error': 'Use multipart/complete for multipart uploads'}, status=status.HTTP_400_BAD_REQUEST)
+
+            # 每个不同目录只查询一次父文件夹
+            paths = {normalize_folder_path(item.get('path', '/')) for item in files}
+            parents = {path: File.objects.folder_at(user, path) for path in paths}
+
+            records = []
+            oss_keys = []
+            uploads = {}
+            for item, upload_id in zip(files, upload_ids):
+                info = sessions[upload_id]
+                uploads[upload_id] = info['file_size']
+                path = normalize_folder_path(item.get('path', '/'))
+                oss_keys.append(f"{user.username}/{item['oss_url'].split(f'/{user.username}/')[-1]}")
+                records.append(File(
+                    user=user,
+                    parent=parents[path],
+                    name=info['file_name'],
+                    content_type=info.get('content_type') or 'application/octet-stream',
+                    size=info['file_size'],
+                    oss_url=item['oss_url'],
+                    path=path,
+                    is_deleted=False,
+                ))
+
+            with transaction.atomic():
+                # 一次性将整批预留转为已用空间
+                updated = quota.commit(user.id, uploads)
+
+                if not updated:
+                    # 文件已上传到OSS，但配额不足，登记后台任务删除OSS文件
+                    enqueue_oss_delete(oss_keys)
+                else:
+                    File.objects.bulk_create(records, batch_size=500)
+
+            if not updated:
+                return Response({
+                    'error': 'Storage quota exceeded after upload',
+                    'message': 'Insufficient storage space'
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            upload_sessions.get_store().delete_many(upload_ids)
+
+            return Response({
+                'count': len(records),
+                'message': 'Files uploaded successfully'
+            }, status=status.HTTP_201_CREATED)
+
+        except Exception as e:
+            return Response({
+                'error': str(e),
+                'message': 'Failed to create file records'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['post'], url_path='multipart/initiate')
+    def multipart_initiate(self, request):
+        """
+        初始化分片上传：预留配额并在 OSS 创建分片上传任务
+        """
+        try:
+            user = request.user
+            file_name = request.data.get('file_name')
+            file_size = request.data.get('file_size')
+
+            if not all([file_name, file_size]):
+                return Response({'error': 'Need file_name and file_size'}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                file_name = validate_file_name(file_name)
+                file_size = parse_file_size(file_size)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                part_size, part_count = multipart_layout(file_size, request.data.get('part_size'))
+            except (ValueError, TypeError):
+                return Response({'error': 'part_size must be a valid integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+            upload_id = new_upload_id(user, file_name, file_size)
+            timeout = settings.MULTIPART_UPLOAD_TIMEOUT
+            if not quota.reserve(user.id, {upload_id: file_size}, timeout=timedelta(seconds=timeout)):
+                return Response({'error': 'Storage quota exceeded'}, status=status.HTTP_400_BAD_REQUEST)
+
+            oss_key = f"{user.username}/{upload_id}/{file_name}"
+            try:
+                oss_upload_id = get_oss_client().initiate_multipart_upload(oss_key)
+            except Exception:
+                quota.release(user.id, [upload_id])
+                raise
+
+            upload_sessions.get_store().put_many({upload_id: {
+                'user': user.id,
+                'file_name': file_name,
+                'file_size': file_size,
+                'content_type': request.data.get('content_type'),
+                'upload_id': upload_id,
+                'multipart': True,
+                'oss_key': oss_key,
+                'oss_upload_id': oss_upload_id,
+                'part_size': part_size,
+                'part_count': part_count,
+            }}, timeout=timeout)
+
+            return Response({
+                'upload_id': upload_id,
+                'part_size': part_size,
+                'part_count': part_count,
+                'message': 'Success'
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return Response({
+                'error': str(e),
+                'message': 'Failed'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['post'], url_path='multipart/part-urls')
+    def multipart_part_urls(self, request):
+        """
+        批量签发分片上传URL，客户端使用 PUT 直接上传分片
+        """
+        try:
+            session, error = get_multipart_session(request.user, request.data.get('upload_id'))
+            if error:
+                return error
+
+            part_numbers = request.data.get('part_numbers')
+            if not isinstance(part_numbers, list) or not part_numbers or len(part_numbers) > MAX_BATCH_SIZE:
+                return Response({'error': f'part_numbers must be a list of 1 to {MAX_BATCH_SIZE} items'}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                part_numbers = [int(number) for number in part_numbers]
+            except (TypeError, ValueError):
+                return Response({'error': 'part_numbers must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+            if any(number < 1 or number > session['part_count'] for number in part_numbers):
+                return Response({'error': f"part_numbers must be between 1 and {session['part_count']}"}, status=status.HTTP_400_BAD_REQUEST)
+
+            token_generator = get_oss_client()
+            return Response({
+                'urls': {
+                    number: token_generator.generate_part_upload_url(session['oss_key'], session['oss_upload_id'], number)
+                    for number in part_numbers
+                },
+                'message': 'Success'
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return Response({
+                'error': str(e),
+                'message': 'Failed'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['post'], url_path='multipart/list-parts')
+    def multipart_list_parts(self, request):
+        """
+        列出已上传的分片，用于断点续传
+        """
+        try:
+            session, error = get_multipart_session(request.user, request.data.get('upload_id'))
+            if error:
+                return error
+
+            return Response({
+                'part_size': session['part_size'],
+                'part_count': session['part_count'],
+                'parts': get_oss_client().list_parts(session['oss_key'], session['oss_upload_id']),
+                'message': 'Success'
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return Response({
+                'error': str(e),
+                'message': 'Failed'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['post'], url_path='multipart/complete')
+    def multipart_complete(self, request):
+        """
+        合并分片并创建文件记录，文件大小以 OSS 中实际上传的分片为准
+        """
+        try:
+            user = request.user
+            session, error = get_multipart_session(user, request.data.get('upload_id'))
+            if error:
+                return error
+
+            token_generator = get_oss_client()
+            parts = token_generator.list_parts(session['oss_key'], session['oss_upload_id'])
+            uploaded_numbers = [part['part_number'] for part in parts]
+            missing = sorted(set(range(1, session['part_count'] + 1)) - set(uploaded_numbers))
+            if missing:
+                return Response({
+                    'error': 'Missing parts',
+                    'part_numbers': missing,
+                    'message': 'Upload incomplete'
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            actual_size = sum(part['size'] for part in parts)
+            if actual_size != session['file_size']:
+                return Response({
+                    'error': f"File size mismatch. Declared: {session['file_size']}, Actual: {actual_size}",
+                    'message': 'File size verification failed'
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            token_generator.complete_multipart_upload(session['oss_key'], session['oss_upload_id'], parts)
+
+            oss_url = f"https://{token_generator.bucket_name}.{token_generator.endpoint.replace('https://', '').replace('http://', '')}/{session['oss_key']}"
+            if not complete_upload(user, session, oss_url, session['oss_key'], request.data.get('path', '/')):
+                return Response({
+                    'error': 'Storage quota exceeded after upload',
+                    'message': 'Insufficient storage space'
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            return Response({
+                'message': 'File uploaded successfully'
+            }, status=status.HTTP_201_CREATED)
+
+        except Exception as e:
+            return Response({
+                'error': str(e),
+                'message': 'Failed to create file record'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['post'], url_path='multipart/abort')
+    def multipart_abort(self, request):
+        """
+        取消分片上传：删除已上传的分片并释放预留配额
+        """
+        try:
+            user = request.user
+            session, error = get_multipart_session(user, request.data.get('upload_id'))
+            if error:
+                return error
+
+            get_oss_client().abort_multipart_upload(session['oss_key'], session['oss_upload_id'])
+            quota.release(user.id, [session['upload_id']])
+            upload_sessions.get_store().delete_many([session['upload_id']])
+
+            return Response({'message': 'Success'}, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return Response({
+                'error': str(e),
+                'message': 'Failed'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['get'], url_path='storage-info', authentication_classes=[CachedJWTAuthentication])
     def get_storage_info(self, request):
         """
         获取用户存储使用情况
@@ -228,7 +1017,8 @@ class FileViewSet(viewsets.ModelViewSet):
             return Response({
                 'quota': user.quota,
                 'used_space': user.used_space,
-                'available_space': user.quota - user.used_space,
+                'reserved_space': user.reserved_space,
+                'available_space': user.quota - user.used_space - user.reserved_space,
                 'usage_percentage': round((user.used_space / user.quota * 100), 2) if user.quota > 0 else 0,
                 'message': 'Success'
             }, status=status.HTTP_200_OK)
@@ -257,8 +1047,8 @@ class FileViewSet(viewsets.ModelViewSet):
             
             # 更新用户已使用空间
             old_used_space = user.used_space
-            user.used_space = total_size
-            user.save()
+            User.objects.filter(pk=user.pk).update(used_space=total_size)
+            invalidate_user(user.pk)
             
             return Response({
                 'old_used_space': old_used_space,
@@ -273,6 +1063,22 @@ class FileViewSet(viewsets.ModelViewSet):
                 'message': 'Failed to recalculate storage'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path='oss-stats',
+        permission_classes=[IsAdminUser]
+    )
+    def oss_stats(self, request):
+        """
+        当前进程内 OSS 请求的次数、失败数与耗时统计（管理员）
+        """
+        return Response({
+            'stats': get_oss_client().stats.snapshot(),
+            'download_url_cache': get_oss_client().url_cache.info(),
+            'message': 'Success'
+        }, status=status.HTTP_200_OK)
+
     @action(
         detail=False,
         methods=['post'],
@@ -283,21 +1089,34 @@ class FileViewSet(viewsets.ModelViewSet):
         创建新文件夹（逻辑文件夹）
         """
         folder_name = request.data.get('folder_name')
-        path = request.data.get('path', '/')
+        path = normalize_folder_path(request.data.get('path', '/'))
         if not folder_name:
             return Response({'error': 'Need folder_name'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # 文件夹名称会拼入子项的物化路径，不能包含路径分隔符或为 "." / ".."
+        try:
+            folder_name = validate_file_name(folder_name)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         user = request.user
-        # 创建一个逻辑文件夹记录，实际不占用OSS存储
-        folder = File.objects.create(
-            user=user,
-            name=folder_name,
-            content_type='folder',
-            size=0,
-            oss_url='',
-            path=path,
-            is_deleted=False
-        )
+        with transaction.atomic():
+            # 锁定用户记录，串行化同一用户的同名检查与创建
+            User.objects.select_for_update().filter(pk=user.pk).exists()
+            if File.objects.folder_exists(user, path, folder_name):
+                return Response({'error': 'Folder already exists'}, status=status.HTTP_400_BAD_REQUEST)
+
+            # 创建一个逻辑文件夹记录，实际不占用OSS存储
+            folder = File.objects.create(
+                user=user,
+                parent=File.objects.folder_at(user, path),
+                name=folder_name,
+                content_type='folder',
+                size=0,
+                oss_url='',
+                path=path,
+                is_deleted=False
+            )
         
         return Response({
             'message': 'Success',
@@ -318,18 +1137,11 @@ class FileViewSet(viewsets.ModelViewSet):
             if file.user != user:
                 return Response({'error': 'No permission'}, status=status.HTTP_403_FORBIDDEN)
             
-            token_generator = OSSTokenGenerator()
-            oss_key = f"{user.username}/{file.oss_url.split(f'/{user.username}/')[-1]}"
-            token_generator.delete_file(oss_key)
-
-            # 逻辑删除
-            file.is_deleted = True
-            file.save()
-            
-            # 更新用户已使用空间（释放空间）
-            if file.content_type != 'folder':
-                user.used_space = max(0, user.used_space - file.size)
-                user.save()
+            # 逻辑删除（文件夹连同全部子孙项）并释放空间，
+            # OSS 对象删除与之在同一事务中登记为后台任务
+            with transaction.atomic():
+                deleted, freed, oss_keys = soft_delete_subtree(user, file)
+                enqueue_oss_delete(oss_keys)
             
             return Response({'message': 'Success'}, status=status.HTTP_200_OK)
         
@@ -353,7 +1165,36 @@ class FileViewSet(viewsets.ModelViewSet):
             
             serializer = FileUploadSerializer(file, data=request.data, partial=True)
             if serializer.is_valid():
-                serializer.save()
+                # 新名称不能包含路径分隔符或为 "." / ".."，否则子孙项的 path 无法对应到文件夹
+                if 'name' in serializer.validated_data:
+                    try:
+                        validate_file_name(serializer.validated_data['name'])
+                    except ValueError as e:
+                        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+                with transaction.atomic():
+                    # 文件夹重命名/移动时连同子孙项一起更新
+                    old_prefix = file.folder_path if file.is_folder else None
+                    codes = drop_cache.codes_for_files(File.objects.subtree(file))
+
+                    path = normalize_folder_path(serializer.validated_data.get('path', file.path))
+                    if old_prefix:
+                        if path.startswith(old_prefix):
+                            return Response({'error': 'Cannot move a folder into itself'}, status=status.HTTP_400_BAD_REQUEST)
+                        # 目标目录下已有同名文件夹时拒绝，否则两个子树的物化路径无法区分
+                        User.objects.select_for_update().filter(pk=user.pk).exists()
+                        name = serializer.validated_data.get('name', file.name)
+                        if File.objects.folder_exists(user, path, name, exclude=file):
+                            return Response({'error': 'Folder already exists'}, status=status.HTTP_400_BAD_REQUEST)
+
+                    if 'path' in serializer.validated_data:
+                        serializer.save(path=path, parent=File.objects.folder_at(user, path))
+                    else:
+                        serializer.save()
+
+                    if old_prefix:
+                        move_subtree(file, old_prefix)
+                    drop_cache.invalidate(codes)
                 return Response({
                     'message': 'Success'
                 }, status=status.HTTP_200_OK)
@@ -385,30 +1226,15 @@ class FileViewSet(viewsets.ModelViewSet):
             
             if code:
                 # 通过code访问，直接查询文件而不依赖get_object()
-                try:
-                    drop = Drop.objects.get(code=code, is_deleted=False)
-                except Drop.DoesNotExist:
-                    return Response({'error': 'Invalid code'}, status=status.HTTP_404_NOT_FOUND)
-
-                if drop.is_expired:
-                    return Response({'error': 'Drop expired'}, status=status.HTTP_400_BAD_REQUEST)
-                
-                if drop.expire_time < timezone.now():
-                    drop.is_expired = True
-                    drop.save()
-                    return Response({'error': 'Drop expired'}, status=status.HTTP_400_BAD_REQUEST)
-
-                if drop.require_login and not request.user.is_authenticated:
-                    return Response({'error': 'Please login'}, status=status.HTTP_401_UNAUTHORIZED)
-
-                if drop.password and drop.password != password:
-                    return Response({'error': 'Wrong password'}, status=status.HTTP_403_FORBIDDEN)
+                drop, files, error = resolve_drop(request, code, password)
+                if error:
+                    return error
                 
                 # 直接从drop的files中获取指定的文件
-                try:
-                    file = drop.files.get(id=pk, is_deleted=False)
-                except File.DoesNotExist:
+                file = next((row for row in files if str(row['id']) == str(pk)), None)
+                if file is None:
                     return Response({'error': 'File not found in this drop'}, status=status.HTTP_404_NOT_FOUND)
+                content_type, oss_url = file['content_type'], file['oss_url']
 
             else:
                 # 正常用户访问，使用get_object()
@@ -418,12 +1244,13 @@ class FileViewSet(viewsets.ModelViewSet):
                 file = self.get_object()
                 if file.user != request.user:
                     return Response({'error': 'No permission'}, status=status.HTTP_403_FORBIDDEN)
+                content_type, oss_url = file.content_type, file.oss_url
                 
-            if file.content_type == 'folder':
+            if content_type == 'folder':
                 return Response({'error': 'You cannot download a folder'}, status=status.HTTP_400_BAD_REQUEST)
             
-            token_generator = OSSTokenGenerator()
-            download_url = token_generator.generate_download_url(file.oss_url)
+            token_generator = get_oss_client()
+            download_url = token_generator.generate_download_url(oss_url)
             
             return Response({
                 'download_url': download_url,
@@ -436,6 +1263,130 @@ class FileViewSet(viewsets.ModelViewSet):
                 'message': 'Failed'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
+    @action(
+        detail=True,
+        methods=['get', 'post'],
+        url_path='proxy',
+        permission_classes=[]
+    )
+    def proxy_download(self, request, pk=None):
+        """
+        通过后端转发下载文件（无法直接访问OSS域名时使用），支持 Range 请求
+        """
+        try:
+            code = request.data.get('code') or request.query_params.get('code', '')
+            password = drop_password(request)
+            try:
+                inline = parse_bool(request.data.get('inline', request.query_params.get('inline', False)))
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            if settings.PROXY_DOWNLOAD_CONCURRENCY <= 0:
+                return Response({'error': 'Proxy download is disabled'}, status=status.HTTP_403_FORBIDDEN)
+
+            if code:
+                drop, files, error = resolve_drop(request, code, password)
+                if error:
+                    return error
+
+                file = next((row for row in files if str(row['id']) == str(pk)), None)
+                if file is None:
+                    return Response({'error': 'File not found in this drop'}, status=status.HTTP_404_NOT_FOUND)
+
+            else:
+                if not request.user.is_authenticated:
+                    return Response({'error': 'Please login'}, status=status.HTTP_401_UNAUTHORIZED)
+
+                file = self.get_queryset().filter(pk=pk).values('name', 'content_type', 'oss_url').first()
+                if file is None:
+                    return Response({'error': 'File not found'}, status=status.HTTP_404_NOT_FOUND)
+
+            if file['content_type'] == 'folder':
+                return Response({'error': 'You cannot download a folder'}, status=status.HTTP_400_BAD_REQUEST)
+
+            # 已登录用户按用户限制并发，匿名访问分享时按客户端IP限制
+            if request.user.is_authenticated:
+                client_id = f"user_{request.user.pk}"
+            else:
+                client_id = f"ip_{request.META.get('REMOTE_ADDR', '')}"
+            return proxy_response(request, client_id, file, inline=inline)
+
+        except Exception as e:
+            return Response({
+                'error': str(e),
+                'message': 'Failed'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(
+        detail=True,
+        methods=['get', 'post'],
+        url_path='zip',
+    )
+    def download_zip(self, request, pk=None):
+        """
+        打包下载文件或整个文件夹（流式 ZIP）
+        """
+        try:
+            file = self.get_queryset().filter(pk=pk).values(*FILE_LIST_FIELDS).first()
+            if file is None:
+                return Response({'error': 'File not found'}, status=status.HTTP_404_NOT_FOUND)
+
+            return zip_response(request, [file], file['name'])
+
+        except Exception as e:
+            return Response({
+                'error': str(e),
+                'message': 'Failed'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='download-batch',
+        permission_classes=[]
+    )
+    def download_batch(self, request):
+        """
+        批量获取文件下载链接（自己的文件，或通过分享码访问分享中的文件）
+        """
+        try:
+            code = request.data.get('code', '')
+            password = request.data.get('password', '')
+
+            try:
+                file_ids = parse_file_ids(request.data.get('ids'))
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            if code:
+                drop, rows, error = resolve_drop(request, code, password)
+                if error:
+                    return error
+                if count_download(drop) is None:
+                    return Response({'error': 'Download limit exceeded'}, status=status.HTTP_400_BAD_REQUEST)
+            else:
+                if not request.user.is_authenticated:
+                    return Response({'error': 'Please login'}, status=status.HTTP_401_UNAUTHORIZED)
+                rows = File.objects.filter(
+                    user=request.user,
+                    id__in=file_ids,
+                    is_deleted=False,
+                ).values('id', 'content_type', 'oss_url')
+
+            download_urls, missing = batch_download_urls(rows, file_ids)
+
+            return Response({
+                'download_urls': download_urls,
+                'missing': missing,
+                'message': 'Success'
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return Response({
+                'error': str(e),
+                'message': 'Failed'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 class DropViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     serializer_class = DropSerializer
@@ -445,16 +1396,22 @@ class DropViewSet(viewsets.ModelViewSet):
         if not user.is_authenticated:
             return Drop.objects.none()
             
-        drops = Drop.objects.filter(user=user, is_deleted=False)
+        # 过期状态在查询时计算，读取请求不写库
+        return Drop.objects.filter(user=user, is_deleted=False).with_expiry()
 
-        from django.utils import timezone
-
-        for drop in drops:
-            if drop.expire_time < timezone.now():
-                drop.is_expired = True
-                drop.save()
+    def perform_update(self, serializer):
+        """
+        默认的 PUT/PATCH 路由：修改（密码、有效期、分享码等）后清除新旧分享码的缓存
+        """
+        old_code = serializer.instance.code
+        with transaction.atomic():
+            drop = serializer.save()
+            drop_cache.invalidate([old_code, drop.code])
 
-        return drops
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            drop_cache.invalidate([instance.code])
     
     @action(
         detail=False,
@@ -476,6 +1433,12 @@ class DropViewSet(viewsets.ModelViewSet):
 
             if not files_ids:
                 return Response({'error': 'Need dropping list'}, status=status.HTTP_400_BAD_REQUEST)
+
+            if not code:
+                return Response({'error': 'Need sharing code'}, status=status.HTTP_400_BAD_REQUEST)
+
+            if Drop.objects.filter(code=code, is_deleted=False).exists():
+                return Response({'error': 'Code already exists'}, status=status.HTTP_400_BAD_REQUEST)
             
             files = File.objects.filter(id__in=files_ids, user=user, is_deleted=False)
             if files.count() != len(files_ids):
@@ -485,17 +1448,21 @@ class DropViewSet(viewsets.ModelViewSet):
             from datetime import timedelta
             expire_time = timezone.now() + timedelta(days=expire_days)
             
-            drop = Drop.objects.create(
-                user=user,
-                expire_days=expire_days,
-                expire_time=expire_time,
-                code=code,
-                require_login=require_login,
-                max_download_count=max_download_count,
-                password=password
-            )
-            drop.files.set(files)
-            drop.save()
+            try:
+                with transaction.atomic():
+                    drop = Drop.objects.create(
+                        user=user,
+                        expire_days=expire_days,
+                        expire_time=expire_time,
+                        code=code,
+                        require_login=require_login,
+                        max_download_count=max_download_count,
+                        password=password
+                    )
+                    drop.files.set(files)
+            except IntegrityError:
+                # 并发创建同一分享码时由唯一索引兜底
+                return Response({'error': 'Code already exists'}, status=status.HTTP_400_BAD_REQUEST)
             
             return Response({
                 'message': 'Success'
@@ -528,37 +1495,20 @@ class DropViewSet(viewsets.ModelViewSet):
             if not code:
                 return Response({'error': 'Need sharing code'}, status=status.HTTP_400_BAD_REQUEST)
             
-            # 直接查询Drop，不依赖get_queryset
-            try:
-                drop = Drop.objects.get(code=code, is_deleted=False)
-            except Drop.DoesNotExist:
-                return Response({'error': 'Invalid code'}, status=status.HTTP_404_NOT_FOUND)
-            
-            from django.utils import timezone
-
-            if drop.expire_time < timezone.now():
-                drop.is_expired = True
-                drop.save()
-
-            if drop.is_expired:
-                return Response({'error': 'Drop expired'}, status=status.HTTP_400_BAD_REQUEST)
+            # 直接按分享码读取（优先读缓存），不依赖get_queryset
+            drop, files, error = resolve_drop(request, code, password)
+            if error:
+                return error
             
-            if drop.require_login and not request.user.is_authenticated:
-                return Response({'error': 'Please login'}, status=status.HTTP_401_UNAUTHORIZED)
-            
-            if drop.password and drop.password != password:
-                return Response({'error': 'Wrong password'}, status=status.HTTP_403_FORBIDDEN)
-            
-            if drop.download_count >= drop.max_download_count:
+            # 校验与计数在同一条条件 UPDATE 中完成，并发访问不会丢失计数或超出上限
+            download_count = count_download(drop)
+            if download_count is None:
                 return Response({'error': 'Download limit exceeded'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            files = drop.files.filter(is_deleted=False)
-            drop.download_count += 1
-            drop.save()
+            drop.download_count = download_count
             
             return Response({
                 'drop': DropSerializer(drop).data,
-                'files': FileSerializer(files, many=True).data,
+                'files': list(serialize_file_rows(files)),
                 'message': 'Success'
             }, status=status.HTTP_200_OK)
         
@@ -568,6 +1518,81 @@ class DropViewSet(viewsets.ModelViewSet):
                 'message': 'Failed'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='download-batch',
+        permission_classes=[]
+    )
+    def download_batch(self, request):
+        """
+        批量获取分享中文件的下载链接，不传 ids 时返回分享内全部文件
+        """
+        try:
+            code = request.data.get('code', '')
+            password = request.data.get('password', '')
+
+            if not code:
+                return Response({'error': 'Need sharing code'}, status=status.HTTP_400_BAD_REQUEST)
+
+            file_ids = request.data.get('ids')
+            if file_ids is not None:
+                try:
+                    file_ids = parse_file_ids(file_ids)
+                except ValueError as e:
+                    return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            drop, files, error = resolve_drop(request, code, password)
+            if error:
+                return error
+
+            # 与获取分享详情、打包下载一样计为一次访问，受 max_download_count 限制
+            if count_download(drop) is None:
+                return Response({'error': 'Download limit exceeded'}, status=status.HTTP_400_BAD_REQUEST)
+
+            download_urls, missing = batch_download_urls(files, file_ids)
+
+            return Response({
+                'download_urls': download_urls,
+                'missing': missing,
+                'message': 'Success'
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return Response({
+                'error': str(e),
+                'message': 'Failed'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(
+        detail=False,
+        methods=['get', 'post'],
+        url_path=r'(?P<code>[^/.]+)/zip',
+        permission_classes=[]
+    )
+    def download_zip(self, request, code=None):
+        """
+        打包下载分享中的全部文件（流式 ZIP），计为一次下载
+        """
+        try:
+            password = drop_password(request)
+
+            drop, files, error = resolve_drop(request, code, password)
+            if error:
+                return error
+
+            download_count = count_download(drop)
+            if download_count is None:
+                return Response({'error': 'Download limit exceeded'}, status=status.HTTP_400_BAD_REQUEST)
+
+            return zip_response(request, files, code)
+
+        except Exception as e:
+            return Response({
+                'error': str(e),
+                'message': 'Failed'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
     @action(
         detail=True,
         methods=['post'],
@@ -585,7 +1610,9 @@ class DropViewSet(viewsets.ModelViewSet):
             
             # 逻辑删除
             drop.is_deleted = True
+            drop.deleted_at = timezone.now()
             drop.save()
+            drop_cache.invalidate([drop.code])
             
             return Response({'message': 'Success'}, status=status.HTTP_200_OK)
         
@@ -0,0 +1,161 @@
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import File, normalize_folder_path, subtree_range
+from .oss_utils import get_oss_client, oss_key_from_url
+from .serializers import FILE_LIST_FIELDS
+
+
+ZIP_CHUNK_SIZE = 64 * 1024
+
+
+def safe_name(name):
+    """
+    将文件名转为单个路径段：替换路径分隔符，'.' / '..' / 空名替换为 '_'，避免解压时写到目标目录之外
+    """
+    name = name.replace('/', '_').replace('\\', '_')
+    return '_' if name in ('', '.', '..') else name
+
+
+def safe_path(path):
+    """
+    将相对目录路径（如 'a/b/'）的每一段转为安全的路径段，保留末尾的 '/'
+    """
+    return ''.join(safe_name(part) + '/' for part in path.split('/') if part)
+
+
+class ZipSink:
+    """
+    不可 seek 的只写输出流，zipfile 写入的数据由生成器及时取出，内存占用与压缩包大小无关
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def archive_entries(roots):
+    """
+    将文件/文件夹行展开为压缩包条目 (包内路径, OSS 对象路径, 修改时间)，目录的 OSS 对象路径为 None
+
+    Args:
+        roots: .values(*FILE_LIST_FIELDS) 格式的文件行，文件夹会展开全部子孙项
+    """
+    seen = set()
+
+    def unique(arcname):
+        # 同一目录下的重名项追加序号，避免解压时相互覆盖
+        is_dir = arcname.endswith('/')
+        stem, dot, ext = arcname.rstrip('/').rpartition('.')
+        if is_dir or not stem:
+            stem, dot, ext = arcname.rstrip('/'), '', ''
+        candidate, index = arcname, 1
+        while candidate in seen:
+            candidate = f"{stem} ({index}){dot}{ext}" + ('/' if is_dir else '')
+            index += 1
+        seen.add(candidate)
+        return candidate
+
+    for root in roots:
+        if root['content_type'] != 'folder':
+            yield unique(safe_name(root['name'])), oss_key_from_url(root['oss_url']), root['created_at']
+            continue
+
+        root_dir = unique(safe_name(root['name']) + '/')
+        yield root_dir, None, root['created_at']
+
+        # 子孙项按目录顺序输出，父目录总在子项之前
+        folder_path = f"{normalize_folder_path(root['path'])}{root['name']}/"
+        lower, upper = subtree_range(folder_path)
+        descendants = File.objects.filter(
+            user_id=root['user_id'],
+            path__gte=lower,
+            path__lt=upper,
+            is_deleted=False,
+        ).order_by('path', 'name', 'id').values(*FILE_LIST_FIELDS)
+        for row in descendants.iterator():
+            arcname = root_dir + safe_path(row['path'][len(folder_path):]) + safe_name(row['name'])
+            if row['content_type'] == 'folder':
+                yield unique(arcname + '/'), None, row['created_at']
+            else:
+                yield unique(arcname), oss_key_from_url(row['oss_url']), row['created_at']
+
+
+def zip_info(arcname, modified):
+    info = zipfile.ZipInfo(arcname, date_time=timezone.localtime(modified).timetuple()[:6])
+    if arcname.endswith('/'):
+        info.external_attr = 0o40755 << 16 | 0x10
+    else:
+        info.external_attr = 0o644 << 16
+    return info
+
+
+def stream_zip(entries, prefetch=None):
+    """
+    边从 OSS 读取边输出 ZIP64 压缩包（不压缩，不落盘）
+
+    最多提前 prefetch 个文件并发发起 OSS GET（复用共享连接池），
+    当前文件写完后按顺序消费，客户端读取慢时生成器自然阻塞
+    """
+    client = get_oss_client()
+    window = prefetch or settings.ZIP_PREFETCH
+    entries = iter(entries)
+    pending = deque()
+    sink = ZipSink()
+
+    with ThreadPoolExecutor(max_workers=window) as pool:
+        def fill():
+            while len(pending) < window:
+                entry = next(entries, None)
+                if entry is None:
+                    return
+                arcname, oss_key, modified = entry
+                future = pool.submit(client.get_object, oss_key) if oss_key else None
+                pending.append((arcname, future, modified))
+
+        try:
+            with zipfile.ZipFile(sink, 'w', allowZip64=True) as archive:
+                fill()
+                while pending:
+                    arcname, future, modified = pending.popleft()
+                    fill()
+                    info = zip_info(arcname, modified)
+                    if future is None:
+                        archive.writestr(info, b'')
+                    else:
+                        with future.result() as response:
+                            if response.status_code != 200:
+                                raise Exception(f"OSS get object failed with status {response.status_code}: {arcname}")
+                            with archive.open(info, 'w', force_zip64=True) as member:
+                                for chunk in response.iter_content(ZIP_CHUNK_SIZE):
+                                    member.write(chunk)
+                                    data = sink.drain()
+                                    if data:
+                                        yield data
+                    data = sink.drain()
+                    if data:
+                        yield data
+            yield sink.drain()
+        finally:
+            # 客户端断开或出错时关闭已预取的连接
+            for _, future, _ in pending:
+                if future is not None and not future.cancel():
+                    try:
+                        future.result().close()
+                    except Exception:
+                        pass